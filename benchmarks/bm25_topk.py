@@ -0,0 +1,85 @@
+"""
+Benchmark exhaustive vs MaxScore-pruned BM25 top-k retrieval.
+
+Builds a synthetic corpus with a Zipfian vocabulary (so queries mix a few
+very common terms with rare ones, like real chat queries) and reports the
+postings evaluated and latency of each strategy.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bm25_topk.py --docs 100000 --k 10
+"""
+import argparse
+import time
+import numpy as np
+
+from search.bm25 import SparseBM25
+
+
+def make_corpus(rng: np.random.Generator, num_docs: int, vocab_size: int, doc_len: int):
+    probs = 1.0 / np.arange(1, vocab_size + 1)
+    probs /= probs.sum()
+    lengths = rng.integers(doc_len // 2, doc_len * 3 // 2, size=num_docs)
+    tokens = rng.choice(vocab_size, size=int(lengths.sum()), p=probs)
+    documents, offset = [], 0
+    for length in lengths:
+        documents.append([f"t{term}" for term in tokens[offset:offset + length]])
+        offset += length
+    return documents, probs
+
+
+def run(model: SparseBM25, queries, k: int, pruning: bool):
+    postings_scored = postings_total = 0
+    latencies = []
+    results = []
+    for query in queries:
+        stats = {}
+        start = time.perf_counter()
+        results.append(model.top_k(query, k=k, pruning=pruning, stats=stats))
+        latencies.append(time.perf_counter() - start)
+        postings_scored += stats["postings_scored"]
+        postings_total += stats["postings_total"]
+    latencies = np.array(latencies) * 1000
+    return {
+        "postings_scored": postings_scored / len(queries),
+        "postings_total": postings_total / len(queries),
+        "mean_ms": latencies.mean(),
+        "p99_ms": np.percentile(latencies, 99),
+    }, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--vocab", type=int, default=50000)
+    parser.add_argument("--doc-len", type=int, default=150)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-len", type=int, default=5)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    documents, probs = make_corpus(rng, args.docs, args.vocab, args.doc_len)
+    start = time.perf_counter()
+    model = SparseBM25().fit(documents)
+    print(f"fit {args.docs} docs, {len(model.weights)} postings in {time.perf_counter() - start:.2f}s")
+
+    queries = [
+        [f"t{term}" for term in rng.choice(args.vocab, size=args.query_len, p=probs)]
+        for _ in range(args.queries)
+    ]
+    exhaustive, expected = run(model, queries, args.k, pruning=False)
+    maxscore, results = run(model, queries, args.k, pruning=True)
+
+    same = sum(
+        np.allclose([s for _, s in a], [s for _, s in b], rtol=1e-6) for a, b in zip(results, expected)
+    )
+    print(f"{'strategy':<12}{'postings/query':>16}{'mean ms':>10}{'p99 ms':>10}")
+    for name, row in (("exhaustive", exhaustive), ("maxscore", maxscore)):
+        print(f"{name:<12}{row['postings_scored']:>16.0f}{row['mean_ms']:>10.3f}{row['p99_ms']:>10.3f}")
+    print(f"postings skipped: {1 - maxscore['postings_scored'] / maxscore['postings_total']:.1%}")
+    print(f"identical top-{args.k} scores: {same}/{len(queries)} queries")
+
+
+if __name__ == "__main__":
+    main()
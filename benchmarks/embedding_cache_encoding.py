@@ -0,0 +1,71 @@
+"""
+Benchmark EmbeddingCache entry encodings: legacy JSON vs binary float32/float16.
+
+Reports bytes per entry, encode and decode time per entry and the maximum
+absolute error after a round trip. With --redis, also times fetching
+--entries keys one GET at a time against a single MGET (get_many).
+
+Usage:
+    PYTHONPATH=src python benchmarks/embedding_cache_encoding.py --dim 1536
+    PYTHONPATH=src python benchmarks/embedding_cache_encoding.py --redis localhost:6379 --entries 200
+"""
+import argparse
+import json
+import time
+import numpy as np
+
+from cache_embedding import EmbeddingCache, decode_embedding, encode_embedding
+
+
+def per_entry_us(function, values, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for value in values:
+            function(value)
+    return (time.perf_counter() - start) / (repeat * len(values)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--redis", default=None, help="host:port of a Redis server for the round trip benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # Embeddings as returned by the provider: lists of Python floats
+    vectors = [list(map(float, row)) for row in rng.normal(scale=0.05, size=(args.entries, args.dim))]
+
+    encoders = {
+        "json": lambda vector: json.dumps(vector).encode(),
+        "float32": lambda vector: encode_embedding(vector, "float32"),
+        "float16": lambda vector: encode_embedding(vector, "float16"),
+    }
+    print(f"{'encoding':<10}{'bytes':>10}{'encode us':>12}{'decode us':>12}{'max error':>12}")
+    for name, encode in encoders.items():
+        entries = [encode(vector) for vector in vectors]
+        encode_us = per_entry_us(encode, vectors, args.repeat)
+        decode_us = per_entry_us(decode_embedding, entries, args.repeat)
+        error = max(np.abs(decode_embedding(entry) - np.asarray(vector)).max() for entry, vector in zip(entries, vectors))
+        print(f"{name:<10}{len(entries[0]):>10}{encode_us:>12.1f}{decode_us:>12.1f}{error:>12.2e}")
+
+    if args.redis:
+        host, port = args.redis.split(":")
+        cache = EmbeddingCache(host=host, port=int(port))
+        keys = [f"benchmark:embedding:{i}" for i in range(args.entries)]
+        cache.set_many(keys, vectors, ttl=60)
+        start = time.perf_counter()
+        for key in keys:
+            cache.get_embedding(key)
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        cache.get_many(keys)
+        batched = time.perf_counter() - start
+        print(f"\n{args.entries} entries: GET loop {single * 1e3:.1f} ms, MGET {batched * 1e3:.1f} ms")
+        cache.redis_client.delete(*keys)
+
+
+if __name__ == "__main__":
+    main()
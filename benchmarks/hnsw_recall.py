@@ -0,0 +1,76 @@
+"""
+Benchmark HNSW recall@k and latency against exact search.
+
+Builds an HNSWIndex over clustered synthetic embeddings (real chunk
+embeddings are far from uniform) and, for each ef_search, reports recall@k
+against the exact top k of InMemoryVectorStore and the mean and p99 query
+latency of both.
+
+Usage:
+    PYTHONPATH=src python benchmarks/hnsw_recall.py --vectors 20000 --dim 256 --m 16 --ef 10 20 50 100 200
+"""
+import argparse
+import time
+import numpy as np
+
+from vectordb.hnsw import HNSWIndex
+from vectordb.inmemory import InMemoryVectorStore
+
+
+def make_vectors(rng: np.random.Generator, num_vectors: int, dim: int, clusters: int = 100):
+    centers = rng.normal(size=(clusters, dim))
+    assignments = rng.integers(clusters, size=num_vectors)
+    return (centers[assignments] + 0.5 * rng.normal(size=(num_vectors, dim))).astype(np.float32)
+
+
+def latency_ms(latencies):
+    latencies = np.array(latencies) * 1000
+    return latencies.mean(), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef", type=int, nargs="+", default=[10, 20, 50, 100, 200])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = make_vectors(rng, args.vectors + args.queries, args.dim)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+
+    exact = InMemoryVectorStore(dim=args.dim, capacity=args.vectors)
+    exact.add_vectors(vectors, [""] * args.vectors)
+    latencies, expected = [], []
+    for query in queries:
+        start = time.perf_counter()
+        expected.append({row["id"] - 1 for row in exact.search_vectors(query, k=args.k)})
+        latencies.append(time.perf_counter() - start)
+    exact_mean, exact_p99 = latency_ms(latencies)
+
+    index = HNSWIndex(args.dim, m=args.m, ef_construction=args.ef_construction, seed=args.seed, capacity=args.vectors)
+    start = time.perf_counter()
+    index.add(vectors)
+    print(f"built HNSW over {args.vectors} x {args.dim} (m={args.m}, "
+          f"ef_construction={args.ef_construction}) in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'search':<12}{f'recall@{args.k}':>12}{'mean ms':>10}{'p99 ms':>10}")
+    print(f"{'exact':<12}{1.0:>12.3f}{exact_mean:>10.3f}{exact_p99:>10.3f}")
+    for ef in args.ef:
+        latencies, hits = [], 0
+        for query, truth in zip(queries, expected):
+            start = time.perf_counter()
+            results = index.search(query, k=args.k, ef_search=ef)
+            latencies.append(time.perf_counter() - start)
+            hits += len(truth & {doc_id for doc_id, _ in results})
+        mean, p99 = latency_ms(latencies)
+        print(f"{f'ef={ef}':<12}{hits / (args.k * len(queries)):>12.3f}{mean:>10.3f}{p99:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Benchmark MilvusVectorDB ingestion: one insert per row vs batched, pipelined inserts.
+
+Inserts the same random embeddings into a fresh collection twice, first with
+one synchronous insert per row (the previous add_documents behaviour) and
+then with MilvusVectorDB.add_document_batches, which splits the rows by
+count and payload bytes and keeps `--inflight` inserts pending. Reports rows
+per second including the final flush.
+
+Runs against milvus-lite (a local file) by default, pass --uri to use a server.
+
+Usage:
+    PYTHONPATH=src python benchmarks/milvus_ingest.py --rows 5000
+    PYTHONPATH=src python benchmarks/milvus_ingest.py --uri http://localhost:19530 --rows 20000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+
+from vectordb.milvus_vectordb import MilvusVectorDB
+
+
+def per_row_insert(vdb: MilvusVectorDB, texts, vectors, metadata):
+    for i in range(len(texts)):
+        vdb.collection.insert([texts[i:i + 1], vectors[i:i + 1].tolist(), metadata[i:i + 1]])
+    vdb.collection.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default=None, help="Milvus URI, defaults to a temporary milvus-lite file")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--batch-rows", type=int, default=1000)
+    parser.add_argument("--batch-bytes", type=int, default=8 << 20)
+    parser.add_argument("--inflight", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    uri = args.uri or os.path.join(tempfile.mkdtemp(), "milvus_ingest.db")
+
+    rng = np.random.default_rng(args.seed)
+    vectors = rng.normal(size=(args.rows, args.dim)).astype(np.float32)
+    texts = [f"benchmark chunk {i} " + "lorem ipsum " * 80 for i in range(args.rows)]
+    metadata = [{"source": "benchmark", "chunk": i} for i in range(args.rows)]
+
+    loaders = {
+        "per-row insert": lambda vdb: per_row_insert(vdb, texts, vectors, metadata),
+        "batched async": lambda vdb: vdb.add_document_batches(
+            [(texts, vectors, metadata)], batch_rows=args.batch_rows, batch_bytes=args.batch_bytes,
+            max_inflight=args.inflight
+        ),
+    }
+    print(f"{'loader':<16}{'seconds':>10}{'rows/s':>12}")
+    for name, load in loaders.items():
+        vdb = MilvusVectorDB("benchmark_ingest", dim=args.dim, uri=uri)
+        start = time.perf_counter()
+        load(vdb)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16}{elapsed:>10.2f}{args.rows / elapsed:>12.0f}")
+        vdb.delete_collection()
+    vdb.close()
+
+
+if __name__ == "__main__":
+    main()
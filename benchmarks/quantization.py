@@ -0,0 +1,83 @@
+"""
+Benchmark memory footprint and recall of quantized vector search.
+
+Stores clustered synthetic embeddings in an InMemoryVectorStore and in
+QuantizedVectorStores with int8 scalar and IVF-PQ codes, and reports the
+bytes per vector held in memory, recall@k against exact search with and
+without full-precision rescoring, and mean query latency.
+
+Usage:
+    PYTHONPATH=src python benchmarks/quantization.py --vectors 50000 --dim 384 --k 10
+"""
+import argparse
+import time
+import numpy as np
+
+from vectordb.inmemory import InMemoryVectorStore
+from vectordb.quantization import IVFPQQuantizer, QuantizedVectorStore, ScalarQuantizer
+
+
+def make_vectors(rng: np.random.Generator, num_vectors: int, dim: int, rank: int = 32, clusters: int = 100):
+    # Embeddings have a low intrinsic dimension: clustered latent factors projected to dim
+    centers = rng.normal(size=(clusters, rank))
+    latent = centers[rng.integers(clusters, size=num_vectors)] + 0.5 * rng.normal(size=(num_vectors, rank))
+    projection = rng.normal(size=(rank, dim))
+    return (latent @ projection + 0.5 * rng.normal(size=(num_vectors, dim))).astype(np.float32)
+
+
+def evaluate(store, queries, expected, k: int, rescore: int):
+    store.rescore = rescore
+    hits, latencies = 0, []
+    for query, truth in zip(queries, expected):
+        start = time.perf_counter()
+        results = store.search_vectors(query, k=k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(truth & {row["id"] for row in results})
+    return hits / (k * len(queries)), np.mean(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=64)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = make_vectors(rng, args.vectors + args.queries, args.dim)
+    vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+    contents = [""] * args.vectors
+
+    exact = InMemoryVectorStore(dim=args.dim, capacity=args.vectors)
+    exact.add_vectors(vectors, contents)
+    start = time.perf_counter()
+    expected = [{row["id"] for row in exact.search_vectors(query, k=args.k)} for query in queries]
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    print(f"{'store':<22}{'bytes/vector':>14}{f'recall@{args.k}':>12}{'mean ms':>10}")
+    print(f"{'float32 exact':<22}{4 * args.dim:>14}{1.0:>12.3f}{exact_ms:>10.3f}")
+    quantizers = {
+        "int8": ScalarQuantizer(args.dim),
+        f"ivfpq m={args.pq_m}": IVFPQQuantizer(args.dim, nlist=args.nlist, m=args.pq_m, nprobe=args.nprobe),
+    }
+    for name, quantizer in quantizers.items():
+        store = QuantizedVectorStore(dim=args.dim, capacity=args.vectors, quantizer=quantizer)
+        store.add_vectors(vectors, contents)
+        start = time.perf_counter()
+        store.train()
+        train_s = time.perf_counter() - start
+        bytes_per_vector = quantizer.nbytes / args.vectors
+        for rescore in (1, 4, 10):
+            recall, mean_ms = evaluate(store, queries, expected, args.k, rescore)
+            label = f"{name} rescore={rescore}"
+            print(f"{label:<22}{bytes_per_vector:>14.0f}{recall:>12.3f}{mean_ms:>10.3f}")
+        print(f"  ({name} trained and encoded in {train_s:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,20 @@ import logging
 
 # Local imports
 from splitter.text_splitter import RecursiveCharacterTextSplitter, CharacterTextSplitter
-from vectordb.uploads import upload_pgvector
+from vectordb.uploads import upload_vector_store_async, get_chunk_cache
+from vectordb.vector_store import create_vector_store
 from utils import chat_completion_without_stream, chat_completion_with_stream
 from search.weight_rerank import WeightRerank
-from cache_embedding import EmbeddingCache
+from search.bm25_index import BM25Index
+from cache_embedding import EmbeddingCache, TieredEmbeddingCache
 from cleaner.text_extractor import TextExtractor
 from cleaner.pdf_extractor import PdfExtractor
 from cleaner.csv_extractor import CSVExtractor
 from cleaner.docx_extractor import WordExtractor
+from configs import (
+    BM25_INDEX_PATH, HYBRID_SEARCH_MODE, VECTOR_BACKEND, EMBEDDING_CACHE_DTYPE, EMBEDDING_LOCAL_CACHE_BYTES,
+    EMBEDDING_LOCAL_CACHE_TTL
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -35,9 +41,17 @@ class ChatResponse(BaseModel):
     """Response model for chat endpoint"""
     response: str
 
+class DeleteRequest(BaseModel):
+    """Request model for the delete documents endpoint"""
+    ids: List[int]
+
 # Initialize services
-redis_cache = EmbeddingCache()
-weight_rerank = WeightRerank(redis_cache)
+redis_cache = TieredEmbeddingCache(
+    EmbeddingCache(dtype=EMBEDDING_CACHE_DTYPE), max_bytes=EMBEDDING_LOCAL_CACHE_BYTES, ttl=EMBEDDING_LOCAL_CACHE_TTL
+)
+bm25_index = BM25Index(snapshot_path=BM25_INDEX_PATH or None)
+vector_store = create_vector_store(VECTOR_BACKEND, dim=EMBEDDING_DIMENSION)
+weight_rerank = WeightRerank(redis_cache, vector_store, bm25_index)
 
 app = FastAPI(
     title="Advanced RAG API",
@@ -45,11 +59,39 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.on_event("startup")
+async def init_vector_store() -> None:
+    """Prepare the vector store (schema, connections) once per process"""
+    if HYBRID_SEARCH_MODE == "sql" and VECTOR_BACKEND != "pgvector":
+        raise ValueError("HYBRID_SEARCH_MODE=sql requires VECTOR_BACKEND=pgvector")
+    await vector_store.init()
+
+@app.on_event("shutdown")
+async def close_vector_store() -> None:
+    """Close the vector store connections"""
+    await vector_store.close()
+
+@app.on_event("startup")
+async def load_bm25_index() -> None:
+    """Open the BM25 index snapshot, building it from the stored documents if needed"""
+    if HYBRID_SEARCH_MODE != "sql":
+        await weight_rerank.load_bm25_index()
+
 @app.get("/")
 async def root() -> Dict[str, str]:
     """Root endpoint returning API status"""
     return {"status": "active", "message": "Welcome to Advanced RAG API"}
 
+@app.get("/embedding-cache/stats")
+async def embedding_cache_stats() -> Dict[str, float]:
+    """Chunk embedding cache counters: lookups, hits, misses, hit rate and provider calls saved"""
+    return get_chunk_cache().metrics()
+
+@app.get("/query-cache/stats")
+async def query_cache_stats() -> Dict[str, float]:
+    """Query embedding cache counters per tier (in-process and Redis) and the local tier's size"""
+    return redis_cache.metrics()
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
     """
@@ -91,7 +133,7 @@ async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
         
         # Process and upload content
         contents = "\n".join(doc.page_content for doc in documents)
-        upload_result = upload_pgvector(EMBEDDING_DIMENSION, contents)
+        upload_result = await upload_vector_store_async(EMBEDDING_DIMENSION, contents, vector_store, bm25_index=bm25_index)
         
         return upload_result
 
@@ -99,6 +141,23 @@ async def upload_file(file: UploadFile = File(...)) -> Dict[str, Any]:
         logger.error(f"Error processing file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/documents/delete")
+async def delete_documents(request: DeleteRequest) -> Dict[str, int]:
+    """
+    Delete chunks from the vector store and the BM25 index
+
+    Args:
+        request: DeleteRequest object containing the chunk ids
+
+    Returns:
+        Dict containing the number of deleted chunks
+    """
+    try:
+        return {"deleted": await weight_rerank.delete_documents(request.ids)}
+    except Exception as e:
+        logger.error(f"Error deleting documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest) -> ChatResponse:
     """
@@ -111,7 +170,9 @@ async def chat(request: ChatRequest) -> ChatResponse:
         ChatResponse object containing the response
     """
     try:
-        documents = weight_rerank.run(request.message, k=5, hybrid_search=True)
+        documents = await weight_rerank.run(
+            request.message, k=5, hybrid_search=True, sql_search=HYBRID_SEARCH_MODE == "sql"
+        )
         response = chat_completion_without_stream(
             [{"role": "user", "content": request.message}],
             documents=documents,
@@ -135,7 +196,9 @@ async def chat_stream(request: ChatRequest) -> StreamingResponse:
         StreamingResponse object containing the chat completion stream
     """
     try:
-        documents = weight_rerank.run(request.message, k=5, hybrid_search=True)
+        documents = await weight_rerank.run(
+            request.message, k=5, hybrid_search=True, sql_search=HYBRID_SEARCH_MODE == "sql"
+        )
         
         async def generate_response() -> AsyncGenerator[str, None]:
             async for chunk in chat_completion_with_stream(
@@ -1,60 +1,141 @@
 import redis
 import numpy as np
 import json
-from typing import Optional, List
+import time
+import struct
+import threading
+from cachetools import TLRUCache
+from typing import Dict, Optional, List, Sequence, Union
+
+# Binary entry: 8 byte header (magic, format version, dtype code, padding) followed by little-endian values
+EMBEDDING_HEADER = struct.Struct("<3sBB3x")
+EMBEDDING_MAGIC = b"EMB"
+EMBEDDING_FORMAT_VERSION = 1
+EMBEDDING_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+EMBEDDING_DTYPE_CODES = {"float32": 1, "float16": 2}
+
+Embedding = Union[List[float], np.ndarray]
+
+
+def encode_embedding(embedding: Embedding, dtype: str = "float32") -> bytes:
+    """Encode an embedding as header + raw little-endian float32 or float16 values.
+    
+    Args:
+        embedding: Embedding vector
+        dtype: "float32" (exact) or "float16" (half the size, about 3 significant digits)
+    """
+    code = EMBEDDING_DTYPE_CODES[dtype]
+    values = np.asarray(embedding, dtype=EMBEDDING_DTYPES[code])
+    return EMBEDDING_HEADER.pack(EMBEDDING_MAGIC, EMBEDDING_FORMAT_VERSION, code) + values.tobytes()
+
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    """Decode a binary entry, or a legacy JSON list, into a float32 array."""
+    if data[:3] != EMBEDDING_MAGIC:
+        # Entries written before the binary format are JSON lists
+        return np.asarray(json.loads(data), dtype=np.float32)
+    _, version, code = EMBEDDING_HEADER.unpack_from(data)
+    if version != EMBEDDING_FORMAT_VERSION or code not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unsupported embedding encoding: version {version}, dtype {code}")
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPES[code], offset=EMBEDDING_HEADER.size).astype(np.float32)
+
 
 class EmbeddingCache:
-    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0):
+    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0, dtype: str = "float32"):
         """Initialize Redis connection for caching embeddings.
         
+        Embeddings are stored in a compact binary encoding (see
+        `encode_embedding`); entries in the previous JSON format are still read.
+        
         Args:
             host: Redis host address
             port: Redis port number
             db: Redis database number
+            dtype: Stored precision, "float32" or "float16"
         """
+        if dtype not in EMBEDDING_DTYPE_CODES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
         self.redis_client = redis.Redis(host=host, port=port, db=db)
+        self.dtype = dtype
         
-    def store_embedding(self, key: str, embedding: List[float], ttl: Optional[int] = None) -> bool:
+    def store_embedding(self, key: str, embedding: Embedding, ttl: Optional[int] = None) -> bool:
         """Store embedding vector in Redis cache.
         
         Args:
             key: Unique identifier for the embedding
-            embedding: List containing the embedding vector
+            embedding: Embedding vector
             ttl: Time-to-live in seconds (optional)
             
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            # Convert embedding list to JSON string
-            embedding_json = json.dumps(embedding)
-            
-            # Store in Redis
-            if ttl:
-                success = self.redis_client.setex(key, ttl, embedding_json)
-            else:
-                success = self.redis_client.set(key, embedding_json)
+            success = self.redis_client.set(key, encode_embedding(embedding, self.dtype), ex=ttl or None)
             return bool(success)
         except Exception:
             return False
             
-    def get_embedding(self, key: str) -> Optional[List[float]]:
+    def get_embedding(self, key: str) -> Optional[np.ndarray]:
         """Retrieve embedding vector from Redis cache.
         
         Args:
             key: Unique identifier for the embedding
             
         Returns:
-            List[float] if found, None otherwise
+            float32 array if found, None otherwise
         """
         try:
             result = self.redis_client.get(key)
             if result is None:
                 return None
                 
-            return json.loads(result)
+            return decode_embedding(result)
         except Exception:
             return None
+
+    def set_many(self, keys: Sequence[str], embeddings: Sequence[Embedding], ttl: Optional[int] = None) -> bool:
+        """Store several embeddings in one pipelined round trip.
+        
+        Args:
+            keys: Unique identifiers of the embeddings
+            embeddings: Embedding vectors, in the order of `keys`
+            ttl: Time-to-live in seconds (optional)
+            
+        Returns:
+            bool: True if every entry was stored, False otherwise
+        """
+        if not keys:
+            return True
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for key, embedding in zip(keys, embeddings):
+                pipeline.set(key, encode_embedding(embedding, self.dtype), ex=ttl or None)
+            return all(pipeline.execute())
+        except Exception:
+            return False
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Retrieve several embeddings with a single MGET.
+        
+        Args:
+            keys: Unique identifiers of the embeddings
+            
+        Returns:
+            One float32 array or None (missing or unreadable) per key
+        """
+        if not keys:
+            return []
+        try:
+            results = self.redis_client.mget(keys)
+        except Exception:
+            return [None] * len(keys)
+        embeddings = []
+        for result in results:
+            try:
+                embeddings.append(None if result is None else decode_embedding(result))
+            except Exception:
+                embeddings.append(None)
+        return embeddings
             
     def delete_embedding(self, key: str) -> bool:
         """Delete embedding vector from Redis cache.
@@ -67,6 +148,117 @@ class EmbeddingCache:
         """
         return bool(self.redis_client.delete(key))
 
+
+class TieredEmbeddingCache:
+    """
+    In-process LRU/TTL tier in front of an EmbeddingCache (Redis).
+
+    Reads go to the local tier first and fall through to Redis, filling the
+    local tier on a hit; writes go to both. Hot query embeddings are thus
+    answered without any network I/O. The local tier is bounded by the bytes
+    of the stored arrays and evicts least recently used entries; an entry
+    lives at most `ttl` seconds, and never longer than the TTL it was stored
+    with in Redis. Returned arrays are read-only, as they are shared.
+
+    Offers the same methods as EmbeddingCache.
+
+    Args:
+        cache: Redis-backed EmbeddingCache
+        max_bytes: Size of the local tier in bytes of embedding data
+        ttl: Maximum lifetime of a local entry in seconds
+    """
+
+    # Approximate per-entry overhead of the array object and cache bookkeeping
+    ENTRY_OVERHEAD_BYTES = 200
+
+    def __init__(self, cache: EmbeddingCache, max_bytes: int = 64 << 20, ttl: float = 300):
+        self.cache = cache
+        self.ttl = ttl
+        self.local = TLRUCache(
+            maxsize=max_bytes,
+            ttu=lambda key, value, now: value[1],
+            timer=time.monotonic,
+            getsizeof=lambda value: value[0].nbytes + self.ENTRY_OVERHEAD_BYTES
+        )
+        self._lock = threading.Lock()
+        self.stats = {"local_hits": 0, "local_misses": 0, "redis_hits": 0, "redis_misses": 0}
+
+    def metrics(self) -> Dict[str, float]:
+        """Hit/miss counters per tier, the overall hit rate and the local tier's size."""
+        lookups = self.stats["local_hits"] + self.stats["local_misses"]
+        hits = self.stats["local_hits"] + self.stats["redis_hits"]
+        with self._lock:
+            entries, size = len(self.local), self.local.currsize
+        return {
+            **self.stats,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "local_entries": entries,
+            "local_bytes": size
+        }
+
+    def _put_local(self, key: str, embedding, ttl: Optional[float] = None):
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        lifetime = min(self.ttl, ttl) if ttl else self.ttl
+        with self._lock:
+            try:
+                self.local[key] = (embedding, time.monotonic() + lifetime)
+            except ValueError:
+                # Larger than the whole local tier
+                pass
+        return embedding
+
+    def _get_local(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self.local.get(key)
+            self.stats["local_hits" if entry is not None else "local_misses"] += 1
+        return None if entry is None else entry[0]
+
+    def _count_redis(self, hits: int, misses: int):
+        with self._lock:
+            self.stats["redis_hits"] += hits
+            self.stats["redis_misses"] += misses
+
+    def store_embedding(self, key: str, embedding: Embedding, ttl: Optional[int] = None) -> bool:
+        """Store an embedding in both tiers, see EmbeddingCache.store_embedding."""
+        self._put_local(key, embedding, ttl)
+        return self.cache.store_embedding(key, embedding, ttl=ttl)
+
+    def get_embedding(self, key: str) -> Optional[np.ndarray]:
+        """Retrieve an embedding from the local tier, or from Redis on a local miss."""
+        embedding = self._get_local(key)
+        if embedding is not None:
+            return embedding
+        embedding = self.cache.get_embedding(key)
+        self._count_redis(embedding is not None, embedding is None)
+        return None if embedding is None else self._put_local(key, embedding)
+
+    def set_many(self, keys: Sequence[str], embeddings: Sequence[Embedding], ttl: Optional[int] = None) -> bool:
+        """Store several embeddings in both tiers, see EmbeddingCache.set_many."""
+        for key, embedding in zip(keys, embeddings):
+            self._put_local(key, embedding, ttl)
+        return self.cache.set_many(keys, embeddings, ttl=ttl)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Retrieve several embeddings, fetching only the local misses from Redis in one MGET."""
+        embeddings = [self._get_local(key) for key in keys]
+        missing = [position for position, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            fetched = self.cache.get_many([keys[position] for position in missing])
+            found = sum(embedding is not None for embedding in fetched)
+            self._count_redis(found, len(missing) - found)
+            for position, embedding in zip(missing, fetched):
+                if embedding is not None:
+                    embeddings[position] = self._put_local(keys[position], embedding)
+        return embeddings
+
+    def delete_embedding(self, key: str) -> bool:
+        """Delete an embedding from both tiers."""
+        with self._lock:
+            self.local.pop(key, None)
+        return self.cache.delete_embedding(key)
+
+
 if __name__ == "__main__":
     # Example
     vector = [0.1, 0.2, 0.3] * 512  # Create a sample list of floats
@@ -0,0 +1,145 @@
+import logging
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PackedContext(NamedTuple):
+    """Result of packing ranked documents into a token budget."""
+
+    documents: List[str]
+    """Documents to send, in rank order, possibly truncated or trimmed."""
+    included_tokens: int
+    """Tokens of the packed documents."""
+    dropped_tokens: int
+    """Tokens left out: duplicates, overlaps, truncated tails and documents over budget."""
+    truncated_documents: int
+    """Number of packed documents that were truncated."""
+    dropped_documents: int
+    """Number of documents left out entirely."""
+
+
+class Tokenizer:
+    """Count and truncate tokens with tiktoken, or about 4 characters per token without it."""
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, model: str):
+        try:
+            import tiktoken
+        except ImportError:
+            self.encoding = None
+            return
+        try:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # Encodings are downloaded on first use, e.g. an offline host cannot load them
+            logger.warning(f"Could not load tiktoken encoding for {model}, estimating 4 characters per token: {e}")
+            self.encoding = None
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return -(-len(text) // self.CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        return text[:max_tokens * self.CHARS_PER_TOKEN]
+
+
+class ContextPacker:
+    """
+    Pack ranked documents into a token budget before chat completion.
+
+    Documents are taken in rank order. Exact and contained duplicates are
+    dropped, and the part of a chunk that overlaps an already packed chunk
+    (the splitter's chunk_overlap) is trimmed. Each chunk is capped at
+    `max_chunk_tokens`, and chunks are added greedily until the budget is
+    spent. The last chunk is truncated to fit if at least `min_chunk_tokens`
+    remain.
+
+    Args:
+        token_budget: Maximum number of context tokens
+        max_chunk_tokens: Optional cap on the tokens of a single chunk
+        min_chunk_tokens: Smallest truncated chunk worth including
+        min_overlap: Minimum number of characters to treat as an overlap
+        model: Model whose tokenizer is used for counting (when tiktoken is installed)
+    """
+
+    def __init__(self, token_budget: int = 3000, max_chunk_tokens: Optional[int] = None,
+                 min_chunk_tokens: int = 50, min_overlap: int = 50, model: str = "gpt-4o-mini"):
+        self.token_budget = token_budget
+        self.max_chunk_tokens = max_chunk_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+        self.min_overlap = min_overlap
+        self.tokenizer = Tokenizer(model)
+
+    def _overlap(self, packed: str, document: str) -> int:
+        """Length of the longest suffix of `packed` that is a prefix of `document`."""
+        start = packed.find(document[:self.min_overlap], max(0, len(packed) - len(document)))
+        while start != -1:
+            if document.startswith(packed[start:]):
+                return len(packed) - start
+            start = packed.find(document[:self.min_overlap], start + 1)
+        return 0
+
+    def _deduplicate(self, document: str, packed: List[str]) -> str:
+        """Return the part of `document` not already covered by the packed documents."""
+        for previous in packed:
+            if document in previous:
+                return ""
+            if len(document) <= self.min_overlap or len(previous) <= self.min_overlap:
+                continue
+            # Chunk following `previous` in the source text
+            overlap = self._overlap(previous, document)
+            if overlap:
+                document = document[overlap:]
+                continue
+            # Chunk preceding `previous` in the source text
+            overlap = self._overlap(document, previous)
+            if overlap:
+                document = document[:-overlap]
+        return document.strip()
+
+    def pack(self, documents: List[str]) -> PackedContext:
+        """
+        Pack ranked documents into the token budget.
+
+        Args:
+            documents: Documents sorted by relevance, best first
+
+        Returns:
+            PackedContext with the packed documents and token accounting
+        """
+        packed: List[str] = []
+        included_tokens = dropped_tokens = truncated = dropped = 0
+
+        for document in documents:
+            tokens = self.tokenizer.count(document)
+            remaining = self.token_budget - included_tokens
+            unique = self._deduplicate(document.strip(), packed) if remaining > 0 else ""
+            if not unique:
+                dropped_tokens += tokens
+                dropped += 1
+                continue
+
+            limit = remaining if self.max_chunk_tokens is None else min(remaining, self.max_chunk_tokens)
+            unique_tokens = self.tokenizer.count(unique)
+            if unique_tokens > limit:
+                if limit < self.min_chunk_tokens:
+                    dropped_tokens += tokens
+                    dropped += 1
+                    continue
+                unique = self.tokenizer.truncate(unique, limit)
+                unique_tokens = self.tokenizer.count(unique)
+                truncated += 1
+
+            packed.append(unique)
+            included_tokens += unique_tokens
+            dropped_tokens += max(tokens - unique_tokens, 0)
+
+        return PackedContext(packed, included_tokens, dropped_tokens, truncated, dropped)
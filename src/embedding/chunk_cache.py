@@ -0,0 +1,117 @@
+import re
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with runs of whitespace collapsed to one space and the ends stripped."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def chunk_cache_key(text: str, provider: str, model: str, dimensions: Optional[int]) -> str:
+    """Cache key of a chunk embedding: sha256 of the normalized text, provider, model and dimensions."""
+    payload = "\x00".join([normalize_text(text), provider, model, str(dimensions)])
+    return "chunk:" + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChunkEmbeddingCache:
+    """
+    Content-addressed cache of chunk embeddings in front of an embedding provider.
+
+    Chunks are looked up by `chunk_cache_key`, so re-uploading an edited file
+    only embeds the chunks whose normalized text changed; repeated chunks of
+    one upload are embedded once. Only the misses are sent to the provider and
+    the results are merged back in input order.
+
+    Args:
+        cache: EmbeddingCache (or any object with get_many/set_many) storing the vectors
+        generator: EmbeddingGenerator whose provider, model and dimensions are part of the key
+        ttl: Optional time-to-live of cached embeddings in seconds
+    """
+
+    def __init__(self, cache, generator, ttl: Optional[int] = None):
+        self.cache = cache
+        self.generator = generator
+        self.ttl = ttl
+        self.stats = {"chunks": 0, "hits": 0, "misses": 0, "duplicates": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of looked up chunks found in the cache."""
+        return self.stats["hits"] / self.stats["chunks"] if self.stats["chunks"] else 0.0
+
+    @property
+    def provider_calls_saved(self) -> int:
+        """Chunk embeddings not requested from the provider: cache hits and repeated chunks."""
+        return self.stats["hits"] + self.stats["duplicates"]
+
+    def metrics(self) -> Dict[str, float]:
+        """Counters, hit rate and embeddings saved, e.g. for a stats endpoint."""
+        return {**self.stats, "hit_rate": self.hit_rate, "provider_calls_saved": self.provider_calls_saved}
+
+    def _key(self, text: str) -> str:
+        return chunk_cache_key(text, self.generator.provider, self.generator.model, self.generator.dimensions)
+
+    def _lookup(self, texts: List[str]) -> Tuple[List[Optional[List[float]]], Dict[str, List[int]]]:
+        """Cached embedding of each text (None on a miss) and the positions of each missing key."""
+        keys = [self._key(text) for text in texts]
+        unique_keys = list(dict.fromkeys(keys))
+        cached = dict(zip(unique_keys, self.cache.get_many(unique_keys)))
+        embeddings = [cached[key] for key in keys]
+        missing: Dict[str, List[int]] = {}
+        for position, key in enumerate(keys):
+            if cached[key] is None:
+                missing.setdefault(key, []).append(position)
+
+        with self._stats_lock:
+            self.stats["chunks"] += len(texts)
+            self.stats["hits"] += len(texts) - sum(len(positions) for positions in missing.values())
+            self.stats["misses"] += len(missing)
+            self.stats["duplicates"] += sum(len(positions) - 1 for positions in missing.values())
+        return embeddings, missing
+
+    def _fill(self, texts: List[str], embeddings: List[Optional[List[float]]], missing: Dict[str, List[int]],
+              new_embeddings: List[List[float]]) -> List[List[float]]:
+        """Store the provider's embeddings of the missing keys and merge them into `embeddings`."""
+        self.cache.set_many(list(missing), new_embeddings, ttl=self.ttl)
+        for positions, embedding in zip(missing.values(), new_embeddings):
+            for position in positions:
+                embeddings[position] = embedding
+        return embeddings
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed `texts`, requesting only uncached chunks from the provider.
+
+        Args:
+            texts: Chunks to embed
+
+        Returns:
+            List of embedding vectors, in the order of `texts`
+        """
+        embeddings, missing = self._lookup(texts)
+        miss_texts = [texts[positions[0]] for positions in missing.values()]
+        new_embeddings = self.generator.get_batch_embeddings(miss_texts) if miss_texts else []
+        return self._fill(texts, embeddings, missing, new_embeddings)
+
+    async def embed_async(self, texts: List[str], scheduler,
+                          progress: Optional[Callable[[int, int], None]] = None) -> List[List[float]]:
+        """
+        Embed `texts` through an EmbeddingScheduler, requesting only uncached chunks.
+
+        Args:
+            texts: Chunks to embed
+            scheduler: EmbeddingScheduler of the same generator
+            progress: Optional callback passed to the scheduler, counts the misses only
+
+        Returns:
+            List of embedding vectors, in the order of `texts`
+        """
+        embeddings, missing = await asyncio.to_thread(self._lookup, texts)
+        miss_texts = [texts[positions[0]] for positions in missing.values()]
+        new_embeddings = await scheduler.embed(miss_texts, progress=progress) if miss_texts else []
+        return await asyncio.to_thread(self._fill, texts, embeddings, missing, new_embeddings)
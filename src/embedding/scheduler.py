@@ -0,0 +1,153 @@
+import time
+import random
+import asyncio
+from typing import Callable, List, Optional
+import openai
+from google.api_core.exceptions import ResourceExhausted
+
+from embedding.third_party import pack_batches
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether `error` is a provider rate limit (HTTP 429) error."""
+    if isinstance(error, (openai.RateLimitError, ResourceExhausted)):
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked to wait before retrying, from the Retry-After header if present."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_minute`, holding at most one minute of tokens.
+
+    Waiters are served in arrival order. A request larger than the bucket
+    waits for a full bucket and leaves it empty, so it cannot block forever.
+
+    Args:
+        rate_per_minute: Tokens added per minute, also the bucket capacity
+        clock: Monotonic clock in seconds, replaceable in tests
+    """
+
+    def __init__(self, rate_per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until `amount` tokens (at most the capacity) are available and take them."""
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+
+class EmbeddingScheduler:
+    """
+    Concurrent, rate-limit-aware embedding of large text lists.
+
+    Texts are packed into batches within the provider's per-request limits
+    (see `pack_batches`). Up to `max_concurrency` batches are in flight,
+    each first taking one request from the requests/min bucket and its
+    token count from the tokens/min bucket. Batches rejected with a rate
+    limit error are retried with exponential backoff and full jitter (or
+    after the provider's Retry-After), up to `max_retries` times.
+
+    Share one scheduler per process, the limits are per API account.
+
+    Args:
+        generator: EmbeddingGenerator, or any object with `embed_batch`, `tokenizer`,
+            `max_batch_inputs` and `max_batch_tokens`
+        requests_per_minute: Request rate limit
+        tokens_per_minute: Input token rate limit
+        max_concurrency: Maximum number of requests in flight
+        max_retries: Retries of a batch after rate limit errors
+        base_delay: Backoff of the first retry in seconds, doubled per retry
+        max_delay: Upper bound of a single backoff in seconds
+    """
+
+    def __init__(self, generator, requests_per_minute: float = 3000, tokens_per_minute: float = 1000000,
+                 max_concurrency: int = 4, max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.generator = generator
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = {"requests": 0, "rate_limited": 0, "texts": 0, "tokens": 0}
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = retry_after(error)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return delay
+
+    async def _embed_batch(self, texts: List[str], tokens: int) -> List[List[float]]:
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self.request_bucket.acquire(1)
+                await self.token_bucket.acquire(tokens)
+                self.stats["requests"] += 1
+                try:
+                    embeddings = await asyncio.to_thread(self.generator.embed_batch, texts)
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt == self.max_retries:
+                        raise
+                    self.stats["rate_limited"] += 1
+                    await asyncio.sleep(self._backoff(attempt, e))
+                    continue
+                self.stats["texts"] += len(texts)
+                self.stats["tokens"] += tokens
+                return embeddings
+
+    async def embed(self, texts: List[str],
+                    progress: Optional[Callable[[int, int], None]] = None) -> List[List[float]]:
+        """
+        Embed `texts` concurrently within the rate limits.
+
+        Args:
+            texts: Texts to embed
+            progress: Optional callback called with (embedded texts, total texts) after each batch
+
+        Returns:
+            List of embedding vectors, in the order of `texts`
+        """
+        token_counts = [self.generator.tokenizer.count(text) for text in texts]
+        batches = pack_batches(token_counts, self.generator.max_batch_inputs, self.generator.max_batch_tokens)
+        done = 0
+
+        async def run(start: int, end: int) -> List[List[float]]:
+            nonlocal done
+            embeddings = await self._embed_batch(texts[start:end], sum(token_counts[start:end]))
+            done += end - start
+            if progress is not None:
+                progress(done, len(texts))
+            return embeddings
+
+        tasks = [asyncio.ensure_future(run(start, end)) for start, end in batches]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return [embedding for embeddings in results for embedding in embeddings]
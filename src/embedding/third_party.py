@@ -1,7 +1,9 @@
-from typing import List, Optional
+import re
+from typing import List, Optional, Tuple
 import openai
 from openai import OpenAI
 import google.generativeai as genai
+from google.api_core.exceptions import InvalidArgument
 from anthropic import Anthropic
 import os
 import asyncio
@@ -9,6 +11,65 @@ import asyncio
 from dotenv import load_dotenv
 load_dotenv()
 
+from context_packer import Tokenizer
+
+# Embedding model and output dimensions per provider (None: the model's native size)
+EMBEDDING_MODELS = {
+    "openai": ("text-embedding-3-small", 1536),
+    "gemini": ("models/text-embedding-004", None),
+}
+
+# Per-request limits of the embedding endpoints: number of inputs and total input tokens
+BATCH_LIMITS = {
+    "openai": (2048, 300000),
+    "gemini": (100, 100 * 2048),
+}
+
+# Errors rejecting a request for its size (too many inputs or tokens), which a smaller batch may avoid
+BATCH_TOO_LARGE_CODES = {"context_length_exceeded", "max_tokens_per_request", "too_many_inputs"}
+BATCH_TOO_LARGE_PATTERN = re.compile(
+    r"maximum context length|too many (tokens|inputs)|tokens per request|payload size exceeds"
+    r"|array too long|maximum length \d+|at most \d+ (requests|inputs)|batch size",
+    re.IGNORECASE,
+)
+
+
+def is_batch_too_large_error(error: Exception) -> bool:
+    """Whether `error` rejects a request for its number of inputs or tokens, from its code or message."""
+    if not isinstance(error, (openai.BadRequestError, InvalidArgument)):
+        return False
+    if getattr(error, "code", None) in BATCH_TOO_LARGE_CODES:
+        return True
+    return bool(BATCH_TOO_LARGE_PATTERN.search(str(error)))
+
+
+def pack_batches(token_counts: List[int], max_inputs: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """
+    Pack consecutive inputs into (start, end) batches within the per-request limits.
+    
+    An input over `max_tokens` on its own still gets a batch of one, the
+    provider decides whether to accept it.
+    
+    Args:
+        token_counts: Tokens of each input
+        max_inputs: Maximum inputs per request
+        max_tokens: Maximum total tokens per request
+        
+    Returns:
+        List of (start, end) index ranges covering all inputs in order
+    """
+    batches = []
+    start = tokens = 0
+    for i, count in enumerate(token_counts):
+        if i > start and (i - start >= max_inputs or tokens + count > max_tokens):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += count
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
+
+
 class EmbeddingGenerator:
     def __init__(self, provider: str = "openai", api_key: Optional[str] = None):
         """
@@ -21,6 +82,9 @@ class EmbeddingGenerator:
         self.provider = provider.lower()
         self.api_key = api_key
         self._setup_client()
+        self.model, self.dimensions = EMBEDDING_MODELS[self.provider]
+        self.max_batch_inputs, self.max_batch_tokens = BATCH_LIMITS[self.provider]
+        self.tokenizer = Tokenizer(self.model)
     
     def _setup_client(self):
         """Setup the appropriate client based on the provider"""
@@ -43,32 +107,80 @@ class EmbeddingGenerator:
         """
         if self.provider == "openai":
             response = self.client.embeddings.create(
-                model="text-embedding-3-small",
+                model=self.model,
                 input=text,
-                dimensions=1536
+                dimensions=self.dimensions
             )
             return response.data[0].embedding
             
         elif self.provider == "gemini":
             result = genai.embed_content(
-                model="models/text-embedding-004",
+                model=self.model,
                 content=text
             )
             return result["embedding"]
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
 
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts in a single request, results in input order"""
+        if self.provider == "openai":
+            response = self.client.embeddings.create(
+                model=self.model,
+                input=texts,
+                dimensions=self.dimensions
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+        elif self.provider == "gemini":
+            result = genai.embed_content(
+                model=self.model,
+                content=texts
+            )
+            return result["embedding"]
+        else:
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed one packed batch, halving it while the provider rejects it as too large
+        
+        Other errors, e.g. an invalid model or dimensions, are raised
+        immediately instead of being retried on every half.
+        
+        Args:
+            texts: Texts within the per-request limits, see pack_batches
+            
+        Returns:
+            List of embedding vectors, in the order of `texts`
+        """
+        try:
+            return self._embed_batch(texts)
+        except (openai.BadRequestError, InvalidArgument) as e:
+            if len(texts) == 1 or not is_batch_too_large_error(e):
+                raise
+            middle = len(texts) // 2
+            return self.embed_batch(texts[:middle]) + self.embed_batch(texts[middle:])
+
     def get_batch_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Generate embeddings for multiple texts in batch
         
+        Texts are packed into as few requests as the provider's input count
+        and token limits allow. Token counts are estimates, so a request the
+        provider still rejects is split in half and retried.
+        
         Args:
             texts: List of input texts
             
         Returns:
-            List of embedding vectors
+            List of embedding vectors, in the order of `texts`
         """
-        return [self.get_embedding(text) for text in texts]
+        token_counts = [self.tokenizer.count(text) for text in texts]
+        embeddings = []
+        for start, end in pack_batches(token_counts, self.max_batch_inputs, self.max_batch_tokens):
+            embeddings.extend(self.embed_batch(texts[start:end]))
+        return embeddings
     
 
 # if __name__ == "__main__":
@@ -1,7 +1,14 @@
+import os
+import json
+import struct
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Sequence, Tuple, Union
 from collections import Counter
 
+SNAPSHOT_MAGIC = b"BM25IDX\x00"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ALIGNMENT = 64
+
 class BM25:
     """
     BM25 implementation for document reranking.
@@ -105,6 +112,406 @@ class BM25:
         #return index and score as a list
         return ranked_docs
         
+class MappedVocab:
+    """
+    Read-only term -> term id mapping over a memory-mapped term table.
+
+    Terms are stored as one UTF-8 blob with an offsets array, plus the term
+    ids sorted by term bytes, so a lookup is a binary search over the mapped
+    pages instead of a dict that every process has to rebuild.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, order: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        self.order = order
+
+    def _term(self, term_id: int) -> bytes:
+        return self.blob[self.offsets[term_id]:self.offsets[term_id + 1]].tobytes()
+
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(int(self.order[mid])) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.order) and self._term(int(self.order[lo])) == key:
+            return int(self.order[lo])
+        return default
+
+    def __getitem__(self, term: str) -> int:
+        term_id = self.get(term)
+        if term_id is None:
+            raise KeyError(term)
+        return term_id
+
+    def __contains__(self, term: str) -> bool:
+        return self.get(term) is not None
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def __iter__(self) -> Iterator[str]:
+        for term_id in range(len(self.order)):
+            yield self._term(term_id).decode("utf-8")
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        for term_id in range(len(self.order)):
+            yield self._term(term_id).decode("utf-8"), term_id
+
+
+class SparseBM25:
+    """
+    Vectorized BM25 over a sparse term-document matrix.
+
+    The corpus is stored term-major (CSC layout): for term id `t`,
+    `indptr[t]:indptr[t + 1]` slices `doc_indices` and `weights`. The BM25
+    term weight tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)) only
+    depends on the document, so it is precomputed once in `fit` and scoring
+    a query is a single sparse mat-vec over the postings of the query terms.
+
+    `top_k(..., pruning=True)` uses the MaxScore upper bound of each term
+    (idf * largest weight in its postings) to skip the postings of terms
+    that can no longer bring a new document into the top k.
+
+    `save` writes every array into a single snapshot file that `load` maps
+    back with np.memmap, so processes opening the same snapshot start
+    without rebuilding anything and share the OS page cache.
+    
+    Parameters:
+    - k1: Term frequency saturation parameter (default: 1.5)
+    - b: Length normalization parameter (default: 0.75)
+    """
+
+    _SNAPSHOT_ARRAYS = ("doc_ids", "doc_lens", "indptr", "doc_indices", "tfs", "weights", "idf", "max_weights")
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Union[Dict[str, int], MappedVocab] = {}
+        self.doc_ids = np.zeros(0, dtype=np.int64)
+        self.doc_lens = np.zeros(0, dtype=np.float32)
+        self.avgdl = 0.0
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_indices = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.float32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.max_weights = np.zeros(0, dtype=np.float32)
+
+    @property
+    def total_docs(self) -> int:
+        return len(self.doc_ids)
+
+    def fit(self, documents: List[List[str]], doc_ids: Optional[Sequence[int]] = None):
+        """
+        Fit the BM25 model on a corpus of documents.
+        
+        Args:
+            documents: List of tokenized documents where each document is a list of tokens
+            doc_ids: Optional ids returned by `top_k` (default: position in `documents`)
+        """
+        vocab: Dict[str, int] = {}
+        term_ids, tfs, counts = [], [], []
+        for doc in documents:
+            doc_term_freqs = Counter(doc)
+            term_ids.extend(vocab.setdefault(term, len(vocab)) for term in doc_term_freqs)
+            tfs.extend(doc_term_freqs.values())
+            counts.append(len(doc_term_freqs))
+
+        if doc_ids is None:
+            doc_ids = range(len(documents))
+        rows = np.repeat(np.arange(len(documents), dtype=np.int32), counts)
+        self._build(
+            vocab,
+            np.asarray(doc_ids, dtype=np.int64),
+            np.array([len(doc) for doc in documents], dtype=np.float32),
+            np.array(term_ids, dtype=np.int64),
+            rows,
+            np.array(tfs, dtype=np.float32),
+        )
+        return self
+
+    @classmethod
+    def from_postings(cls, postings: Dict[str, Dict[int, int]], doc_lens: Dict[int, int],
+                      k1: float = 1.5, b: float = 0.75) -> "SparseBM25":
+        """
+        Build the sparse matrix from inverted index postings.
+        
+        Args:
+            postings: Mapping of term -> {doc_id: term frequency}
+            doc_lens: Mapping of doc_id -> document length
+            k1: Term frequency saturation parameter
+            b: Length normalization parameter
+        """
+        model = cls(k1=k1, b=b)
+        doc_ids = np.fromiter(doc_lens.keys(), dtype=np.int64, count=len(doc_lens))
+        lens = np.fromiter(doc_lens.values(), dtype=np.float32, count=len(doc_lens))
+        order = np.argsort(doc_ids)
+        doc_ids, lens = doc_ids[order], lens[order]
+
+        vocab: Dict[str, int] = {}
+        posting_docs, tfs, counts = [], [], []
+        for term, docs in postings.items():
+            vocab[term] = len(vocab)
+            posting_docs.extend(docs.keys())
+            tfs.extend(docs.values())
+            counts.append(len(docs))
+
+        rows = np.searchsorted(doc_ids, np.array(posting_docs, dtype=np.int64)).astype(np.int32)
+        cols = np.repeat(np.arange(len(vocab), dtype=np.int64), counts)
+        model._build(vocab, doc_ids, lens, cols, rows, np.array(tfs, dtype=np.float32))
+        return model
+
+    def _build(self, vocab: Dict[str, int], doc_ids: np.ndarray, doc_lens: np.ndarray,
+               cols: np.ndarray, rows: np.ndarray, tfs: np.ndarray):
+        """Sort (term, doc, tf) triples into CSC arrays and precompute weights."""
+        total_docs = len(doc_ids)
+        self.vocab = vocab
+        self.doc_ids = doc_ids
+        self.doc_lens = doc_lens
+        self.avgdl = float(doc_lens.mean()) if total_docs else 0.0
+
+        # Postings of each term sorted by document
+        order = np.lexsort((rows, cols))
+        self.doc_indices = rows[order].astype(np.int32)
+        self.tfs = tfs[order]
+        doc_freqs = np.bincount(cols, minlength=len(vocab))
+        self.indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(doc_freqs, out=self.indptr[1:])
+
+        avgdl = self.avgdl if self.avgdl > 0 else 1.0
+        norm = self.k1 * (1 - self.b + self.b * doc_lens / avgdl)
+        self.weights = (self.tfs * (self.k1 + 1) / (self.tfs + norm[self.doc_indices])).astype(np.float32)
+        self.idf = np.log((total_docs - doc_freqs + 0.5) / (doc_freqs + 0.5) + 1.0).astype(np.float32)
+        # Largest weight in each posting list, used as the MaxScore upper bound
+        self.max_weights = np.zeros(len(vocab), dtype=np.float32)
+        nonempty = doc_freqs > 0
+        if nonempty.any():
+            self.max_weights[nonempty] = np.maximum.reduceat(self.weights, self.indptr[:-1][nonempty])
+
+    def save(self, path: str):
+        """
+        Write the model to a snapshot file.
+
+        The file is written next to `path` and renamed over it, so readers
+        either see the previous snapshot or the complete new one.
+
+        Layout: magic, header length (uint64), JSON header with parameters and
+        array offsets, then every array aligned to 64 bytes.
+        
+        Args:
+            path: Snapshot file path
+        """
+        if isinstance(self.vocab, MappedVocab):
+            terms = [term.encode("utf-8") for term in self.vocab]
+        else:
+            terms = [term.encode("utf-8") for term, _ in sorted(self.vocab.items(), key=lambda x: x[1])]
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(term) for term in terms], out=term_offsets[1:])
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in self._SNAPSHOT_ARRAYS}
+        arrays["term_offsets"] = term_offsets
+        arrays["term_order"] = np.array(sorted(range(len(terms)), key=terms.__getitem__), dtype=np.int64)
+        arrays["term_blob"] = np.frombuffer(b"".join(terms), dtype=np.uint8)
+
+        header = {"version": SNAPSHOT_VERSION, "k1": self.k1, "b": self.b, "avgdl": self.avgdl, "arrays": {}}
+        # Offsets depend on the header size, so size the header with placeholder offsets first
+        for name, array in arrays.items():
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": 0}
+        offset = len(SNAPSHOT_MAGIC) + 8 + len(json.dumps(header)) + 32 * len(arrays)
+        for name, array in arrays.items():
+            offset = -(-offset // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+            header["arrays"][name]["offset"] = offset
+            offset += array.nbytes
+        header_bytes = json.dumps(header).encode("utf-8")
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(SNAPSHOT_MAGIC)
+                f.write(struct.pack("<Q", len(header_bytes)))
+                f.write(header_bytes)
+                for name, array in arrays.items():
+                    f.write(b"\0" * (header["arrays"][name]["offset"] - f.tell()))
+                    f.write(array.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "SparseBM25":
+        """
+        Open a snapshot written by `save`.
+        
+        Args:
+            path: Snapshot file path
+            mmap: Map the arrays read-only instead of reading them into memory
+        """
+        with open(path, "rb") as f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a BM25 snapshot")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len))
+        if header["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported BM25 snapshot version {header['version']}")
+
+        data = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = data[spec["offset"]:spec["offset"] + count * dtype.itemsize].view(dtype)
+
+        model = cls(k1=header["k1"], b=header["b"])
+        for name in cls._SNAPSHOT_ARRAYS:
+            setattr(model, name, arrays[name])
+        model.avgdl = header["avgdl"]
+        model.vocab = MappedVocab(arrays["term_blob"], arrays["term_offsets"], arrays["term_order"])
+        return model
+
+    def _query_terms(self, query: List[str]) -> List[Tuple[int, int]]:
+        """Map query tokens to (term id, multiplicity), dropping unknown terms."""
+        return [(self.vocab[term], count) for term, count in Counter(query).items() if term in self.vocab]
+
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        """
+        Calculate BM25 scores of every document for a query.
+        
+        Args:
+            query: List of query tokens
+            
+        Returns:
+            Array of scores indexed by document position
+        """
+        docs, weights = [], []
+        for term_id, count in self._query_terms(query):
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs.append(self.doc_indices[start:end])
+            weights.append(self.weights[start:end] * (self.idf[term_id] * count))
+        if not docs:
+            return np.zeros(self.total_docs, dtype=np.float64)
+        return np.bincount(np.concatenate(docs), weights=np.concatenate(weights), minlength=self.total_docs)
+
+    def _top_positions(self, scores: np.ndarray, k: Optional[int]) -> np.ndarray:
+        """Positions of the k highest non-zero scores, best first."""
+        candidates = np.flatnonzero(scores)
+        if k is not None and k < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    def top_k(self, query: List[str], k: Optional[int] = 10, pruning: bool = False,
+              stats: Optional[dict] = None) -> List[Tuple[int, float]]:
+        """
+        Return the best matching documents for a query.
+        
+        Args:
+            query: List of query tokens
+            k: Number of documents to return (default: 10, None returns all matches)
+            pruning: Skip postings that cannot reach the top k (MaxScore), requires k
+            stats: Optional dict filled with `postings_total` and `postings_scored`
+            
+        Returns:
+            List of (doc_id, score) tuples sorted by score in descending order
+        """
+        if pruning and k is not None:
+            positions, scores = self._maxscore(query, k, stats)
+        else:
+            scores = self.get_scores(query)
+            positions = self._top_positions(scores, k)
+            if stats is not None:
+                stats["postings_total"] = stats["postings_scored"] = self._postings_count(query)
+        return [(int(self.doc_ids[pos]), float(scores[pos])) for pos in positions]
+
+    def _postings_count(self, query: List[str]) -> int:
+        return int(sum(self.indptr[term_id + 1] - self.indptr[term_id] for term_id, _ in self._query_terms(query)))
+
+    def _maxscore(self, query: List[str], k: int, stats: Optional[dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Term-at-a-time MaxScore top-k.
+
+        Terms are processed by decreasing upper bound. The k-th best partial
+        score is a lower bound of the final k-th score (the threshold). Once
+        the upper bounds of the remaining terms sum to no more than the
+        threshold, documents not seen yet cannot enter the top k: remaining
+        terms become non-essential and are only looked up for the surviving
+        candidates, which are dropped as soon as their partial score plus the
+        remaining upper bound falls to the threshold.
+        """
+        if k <= 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(self.total_docs, dtype=np.float64)
+        terms = sorted(
+            ((term_id, count, float(self.idf[term_id] * count * self.max_weights[term_id]))
+             for term_id, count in self._query_terms(query)),
+            key=lambda x: x[2], reverse=True
+        )
+        remaining = np.cumsum([bound for _, _, bound in terms][::-1])[::-1]
+
+        scores = np.zeros(self.total_docs, dtype=np.float64)
+        candidates = np.zeros(0, dtype=np.int32)
+        threshold = 0.0
+        essential = True
+        postings_total = postings_scored = 0
+        for (term_id, count, _), rest in zip(terms, remaining):
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            docs = self.doc_indices[start:end]
+            scale = self.idf[term_id] * count
+            postings_total += end - start
+
+            if essential and rest <= threshold:
+                essential = False
+            if essential:
+                # Documents appear once per posting list, so fancy-index add is safe
+                scores[docs] += self.weights[start:end] * scale
+                candidates = np.union1d(candidates, docs)
+                postings_scored += end - start
+            else:
+                candidates = candidates[scores[candidates] + rest > threshold]
+                pos = np.searchsorted(docs, candidates)
+                found = pos < len(docs)
+                found[found] = docs[pos[found]] == candidates[found]
+                scores[candidates[found]] += self.weights[start + pos[found]] * scale
+                postings_scored += int(found.sum())
+
+            if len(candidates) >= k:
+                threshold = float(np.partition(scores[candidates], len(candidates) - k)[len(candidates) - k])
+
+        if stats is not None:
+            stats["postings_total"] = int(postings_total)
+            stats["postings_scored"] = int(postings_scored)
+        candidates = candidates[scores[candidates] > 0]
+        if k < len(candidates):
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")], scores
+
+    def rerank(self, query: List[str], documents: Optional[List[List[str]]] = None,
+               top_k: int = None) -> List[Tuple[int, float]]:
+        """
+        Rerank the fitted documents, drop-in replacement for `BM25.rerank`.
+        
+        Args:
+            query: List of query tokens
+            documents: Ignored, the fitted corpus is used
+            top_k: Number of top documents to return (default: return all)
+            
+        Returns:
+            List of (index, score) tuples of the top documents sorted by index
+        """
+        scores = self.get_scores(query)
+        if top_k is None or top_k >= len(scores):
+            ranked = np.arange(len(scores))
+        else:
+            ranked = np.sort(np.argpartition(-scores, top_k - 1)[:top_k])
+        return [(int(idx), float(scores[idx])) for idx in ranked]
+
+
 # if __name__ == "__main__":
 #     documents = [
 #         ["this", "is", "a", "test"],
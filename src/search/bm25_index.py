@@ -0,0 +1,284 @@
+import os
+import threading
+import contextlib
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import Counter
+from search.bm25 import SparseBM25
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokenize text the same way the BM25 corpus is tokenized."""
+    return text.split()
+
+
+class BM25Index:
+    """
+    Incrementally updated BM25 inverted index.
+
+    Keeps term -> {doc_id: term frequency} postings, per-document lengths and
+    a lazily filled IDF cache, so documents can be added or removed one batch
+    at a time and queries only touch the postings of the query terms.
+
+    `search` runs on a `SparseBM25` compiled from the postings, which is
+    rebuilt on the first query after an update (or eagerly via `compile`).
+
+    With a `snapshot_path`, the index is opened from the memory-mapped
+    snapshot and every update is written back to it under an exclusive file
+    lock, after first reloading the snapshot in case another worker changed
+    it. Workers call `refresh` to pick up snapshots written by others. The
+    postings dicts are only rebuilt from the snapshot when the index is
+    updated, so read-only workers never hold their own copy.
+
+    Parameters:
+    - k1: Term frequency saturation parameter (default: 1.5)
+    - b: Length normalization parameter (default: 0.75)
+    - snapshot_path: Optional snapshot file shared between processes
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, snapshot_path: Optional[str] = None):
+        self.k1 = k1
+        self.b = b
+        self.snapshot_path = snapshot_path
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_lens: Dict[int, int] = {}
+        self.total_len = 0
+        self._idf_cache: Dict[str, float] = {}
+        self._compiled: Optional[SparseBM25] = None
+        self._thawed = True
+        self._snapshot_stamp = None
+        self._lock = threading.RLock()
+        self.refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            if not self._thawed:
+                return self._compiled.total_docs
+            return len(self.doc_lens)
+
+    def __contains__(self, doc_id: int) -> bool:
+        with self._lock:
+            self._thaw()
+            return doc_id in self.doc_lens
+
+    def doc_ids(self) -> set:
+        """Ids of the indexed documents, read from the snapshot without rebuilding the postings."""
+        with self._lock:
+            if not self._thawed:
+                return set(self._compiled.doc_ids.tolist())
+            return set(self.doc_lens)
+
+    @property
+    def avgdl(self) -> float:
+        """Average document length of the indexed corpus."""
+        with self._lock:
+            if not self._thawed:
+                return self._compiled.avgdl
+            return self.total_len / len(self.doc_lens) if self.doc_lens else 0.0
+
+    def add_documents(self, doc_ids: Iterable[int], documents: Iterable[List[str]]):
+        """
+        Add tokenized documents to the index.
+
+        Documents whose id is already indexed are replaced.
+
+        Args:
+            doc_ids: Unique ids of the documents (e.g. vector_store primary keys)
+            documents: List of tokenized documents where each document is a list of tokens
+        """
+        doc_ids = list(doc_ids)
+        with self._snapshot_lock(), self._lock:
+            self._thaw()
+            self._remove(set(doc_ids) & self.doc_lens.keys())
+            for doc_id, doc in zip(doc_ids, documents):
+                for term, tf in Counter(doc).items():
+                    self.postings.setdefault(term, {})[doc_id] = tf
+                self.doc_lens[doc_id] = len(doc)
+                self.total_len += len(doc)
+            self._invalidate()
+            if self.snapshot_path:
+                self.save()
+
+    def remove_documents(self, doc_ids: Iterable[int]):
+        """
+        Remove documents from the index.
+
+        Args:
+            doc_ids: Ids of the documents to remove, unknown ids are ignored
+        """
+        with self._snapshot_lock(), self._lock:
+            self._thaw()
+            self._remove(set(doc_ids) & self.doc_lens.keys())
+            self._invalidate()
+            if self.snapshot_path:
+                self.save()
+
+    def clear(self):
+        """Remove every document from the index."""
+        with self._snapshot_lock(), self._lock:
+            self.postings, self.doc_lens, self.total_len = {}, {}, 0
+            self._thawed = True
+            self._invalidate()
+
+    def _invalidate(self):
+        self._idf_cache.clear()
+        self._compiled = None
+
+    def _remove(self, doc_ids: set):
+        if not doc_ids:
+            return
+        # Postings are keyed by term, so scan the vocabulary once per batch
+        for term in list(self.postings):
+            docs = self.postings[term]
+            for doc_id in doc_ids & docs.keys():
+                del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+        for doc_id in doc_ids:
+            self.total_len -= self.doc_lens.pop(doc_id)
+
+    def idf(self, term: str) -> float:
+        """
+        Return the (cached) IDF of a term, 0.0 for unknown terms.
+
+        Args:
+            term: Term to look up
+        """
+        with self._lock:
+            self._thaw()
+            idf = self._idf_cache.get(term)
+            if idf is None:
+                doc_freq = len(self.postings.get(term, ()))
+                if doc_freq == 0:
+                    return 0.0
+                total_docs = len(self.doc_lens)
+                idf = float(np.log((total_docs - doc_freq + 0.5) / (doc_freq + 0.5) + 1.0))
+                self._idf_cache[term] = idf
+            return idf
+
+    def get_scores(self, query: List[str]) -> Dict[int, float]:
+        """
+        Calculate BM25 scores for every document matching at least one query term.
+
+        Args:
+            query: List of query tokens
+
+        Returns:
+            Dictionary mapping document id to BM25 score
+        """
+        with self._lock:
+            self._thaw()
+            scores: Dict[int, float] = {}
+            if not self.doc_lens:
+                return scores
+            avgdl = self.avgdl
+            for term in query:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = self.idf(term)
+                for doc_id, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lens[doc_id] / avgdl)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            return scores
+
+    def compile(self) -> SparseBM25:
+        """
+        Return the vectorized scorer for the current postings, building it if stale.
+        """
+        with self._lock:
+            if self._compiled is None:
+                self._compiled = SparseBM25.from_postings(self.postings, self.doc_lens, k1=self.k1, b=self.b)
+            return self._compiled
+
+    def search(self, query: List[str], top_k: Optional[int] = 10, pruning: bool = True) -> List[Tuple[int, float]]:
+        """
+        Return the best matching documents for a query.
+
+        Args:
+            query: List of query tokens
+            top_k: Number of documents to return (default: 10, None returns all matches)
+            pruning: Use MaxScore pruning when top_k is set (default: True)
+
+        Returns:
+            List of (doc_id, score) tuples sorted by score in descending order
+        """
+        return self.compile().top_k(query, k=top_k, pruning=pruning)
+
+    def save(self, path: Optional[str] = None):
+        """
+        Atomically write the compiled index to a snapshot file.
+
+        Args:
+            path: Snapshot file path (default: `snapshot_path`)
+        """
+        path = path or self.snapshot_path
+        with self._lock:
+            self.compile().save(path)
+            if path == self.snapshot_path:
+                self._snapshot_stamp = self._stat_snapshot()
+
+    def refresh(self) -> bool:
+        """
+        Reopen the snapshot if it was replaced since it was last loaded or saved.
+
+        Returns:
+            True if a newer snapshot was loaded
+        """
+        stamp = self._stat_snapshot()
+        if stamp is None:
+            return False
+        with self._lock:
+            if stamp == self._snapshot_stamp:
+                return False
+            model = SparseBM25.load(self.snapshot_path, mmap=True)
+            self.k1, self.b = model.k1, model.b
+            self.postings, self.doc_lens, self.total_len = {}, {}, 0
+            self._idf_cache.clear()
+            self._compiled = model
+            self._thawed = False
+            self._snapshot_stamp = stamp
+            return True
+
+    def _stat_snapshot(self) -> Optional[Tuple[int, int, int]]:
+        if not self.snapshot_path:
+            return None
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    @contextlib.contextmanager
+    def _snapshot_lock(self):
+        """Hold an exclusive cross-process lock on the snapshot, reloading it first."""
+        if not self.snapshot_path:
+            yield
+            return
+        import fcntl
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.snapshot_path)), exist_ok=True)
+        with open(f"{self.snapshot_path}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _thaw(self):
+        """Rebuild the postings dicts of an index opened from a snapshot."""
+        if self._thawed:
+            return
+        model = self._compiled
+        doc_ids = model.doc_ids.tolist()
+        self.doc_lens = dict(zip(doc_ids, model.doc_lens.astype(np.int64).tolist()))
+        self.total_len = sum(self.doc_lens.values())
+        indptr = model.indptr.tolist()
+        posting_docs = model.doc_ids[model.doc_indices].tolist()
+        tfs = model.tfs.astype(np.int64).tolist()
+        self.postings = {
+            term: dict(zip(posting_docs[indptr[term_id]:indptr[term_id + 1]], tfs[indptr[term_id]:indptr[term_id + 1]]))
+            for term, term_id in model.vocab.items()
+        }
+        self._thawed = True
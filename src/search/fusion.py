@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional, Sequence
+
+
+def _merge(fused: Dict[int, dict], candidate: dict) -> dict:
+    """Merge a candidate into the fused entry with the same id, keeping the first value of each field."""
+    entry = fused.setdefault(candidate["id"], {"id": candidate["id"], "score": 0.0})
+    for key, value in candidate.items():
+        if key != "score":
+            entry.setdefault(key, value)
+    return entry
+
+
+def _top(fused: Dict[int, dict], k: Optional[int]) -> List[dict]:
+    ranked = sorted(fused.values(), key=lambda x: x["score"], reverse=True)
+    return ranked if k is None else ranked[:k]
+
+
+def weighted_score_fusion(results: Sequence[List[dict]], weights: Sequence[float],
+                          k: Optional[int] = None) -> List[dict]:
+    """
+    Fuse ranked candidate lists by a weighted sum of min-max normalized scores.
+
+    Candidates are joined by their "id". Scores are normalized per list to
+    [0, 1] so BM25 scores and cosine similarities are comparable, and a
+    candidate missing from a list contributes 0 for it.
+
+    Args:
+        results: Candidate lists, each a list of dicts with at least "id" and "score"
+        weights: Weight of each list
+        k: Number of results to return (default: all candidates)
+
+    Returns:
+        Fused candidates sorted by fused "score" in descending order
+    """
+    fused: Dict[int, dict] = {}
+    for candidates, weight in zip(results, weights):
+        if not candidates:
+            continue
+        scores = [candidate["score"] for candidate in candidates]
+        low, high = min(scores), max(scores)
+        for candidate in candidates:
+            normalized = (candidate["score"] - low) / (high - low) if high > low else 1.0
+            _merge(fused, candidate)["score"] += weight * normalized
+    return _top(fused, k)
+
+
+def reciprocal_rank_fusion(results: Sequence[List[dict]], k: Optional[int] = None, rrf_k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> List[dict]:
+    """
+    Fuse ranked candidate lists with Reciprocal Rank Fusion.
+
+    score(d) = sum over lists of weight / (rrf_k + rank of d in the list),
+    which only uses ranks and so needs no score normalization.
+
+    Args:
+        results: Candidate lists, each a list of dicts with at least "id", best first
+        k: Number of results to return (default: all candidates)
+        rrf_k: Rank smoothing constant (default: 60)
+        weights: Optional weight of each list (default: 1.0 each)
+
+    Returns:
+        Fused candidates sorted by fused "score" in descending order
+    """
+    if weights is None:
+        weights = [1.0] * len(results)
+    fused: Dict[int, dict] = {}
+    for candidates, weight in zip(results, weights):
+        for rank, candidate in enumerate(candidates, start=1):
+            _merge(fused, candidate)["score"] += weight / (rrf_k + rank)
+    return _top(fused, k)
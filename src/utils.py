@@ -1,16 +1,38 @@
 import os
 from openai import OpenAI
-from typing import List, Dict, Any, AsyncGenerator
+from typing import List, Dict, Any, AsyncGenerator, Optional
 import json
+import logging
 
+from configs import CONTEXT_TOKEN_BUDGET, CONTEXT_MAX_CHUNK_TOKENS
+from context_packer import ContextPacker
 
-def chat_completion_without_stream(messages, model="gpt-4o-mini", api_key=None, documents=None):
+logger = logging.getLogger(__name__)
+
+default_context_packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET, max_chunk_tokens=CONTEXT_MAX_CHUNK_TOKENS)
+
+
+def pack_documents(documents: List[str], context_packer: Optional[ContextPacker] = None) -> List[str]:
+    """
+    Deduplicate and fit ranked documents into the context token budget
+    """
+    packed = (context_packer or default_context_packer).pack(documents)
+    logger.info(
+        f"Context: {packed.included_tokens} tokens included in {len(packed.documents)} documents, "
+        f"{packed.dropped_tokens} tokens dropped ({packed.dropped_documents} documents dropped, "
+        f"{packed.truncated_documents} truncated)"
+    )
+    return packed.documents
+
+
+def chat_completion_without_stream(messages, model="gpt-4o-mini", api_key=None, documents=None, context_packer=None):
     """
     Non-streaming version of chat completion
     """
     if documents:
         # Convert messages list to include document context
-        history_message = {"role": "system", "content": f"Here are the documents:\n{'\n'.join(documents)}"} 
+        context = "\n".join(pack_documents(documents, context_packer))
+        history_message = {"role": "system", "content": f"Here are the documents:\n{context}"} 
         messages = messages + [history_message]  # Correctly concatenate lists
     client = OpenAI(api_key=api_key)
 
@@ -34,16 +56,18 @@ async def chat_completion_with_stream(
     messages: List[Dict[str, str]],
     documents: List[str] = None,
     api_key: str = None,
-    model: str = "gpt-4o-mini"
+    model: str = "gpt-4o-mini",
+    context_packer: Optional[ContextPacker] = None
 ) -> AsyncGenerator[str, None]:
     """
     Generate streaming chat completion using OpenAI's API
     
     Args:
         messages: List of message dictionaries
-        documents: Optional list of context documents
+        documents: Optional list of context documents, sorted by relevance
         api_key: OpenAI API key
         model: Model to use for completion
+        context_packer: Packer fitting documents into the token budget (default: configured budget)
         
     Yields:
         Chunks of the response as they become available
@@ -51,7 +75,7 @@ async def chat_completion_with_stream(
     client = OpenAI(api_key=api_key)
         
     if documents:
-        context = "\n\nContext:\n" + "\n".join(documents)
+        context = "\n\nContext:\n" + "\n".join(pack_documents(documents, context_packer))
         messages[-1]["content"] += context
     
     try:
@@ -0,0 +1,273 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from vectordb.pgvector import (
+    METADATA_FILTER_STRATEGIES, SCHEMA_STATEMENTS, VECTOR_STORAGE_MODES, choose_filter_strategy, metadata_filter_sql,
+    metadata_index_statement, search_settings, vector_index_statement, vector_search_sql
+)
+
+
+class AsyncPGVector:
+    """
+    Non-blocking PGVector on a pooled SQLAlchemy async engine (asyncpg).
+
+    Create one instance per process and share it: the engine keeps up to
+    `pool_size + max_overflow` connections open across requests. Call `init`
+    once at startup to create the schema and `close` at shutdown.
+
+    Embeddings are sent as real[] parameters and cast to vector in SQL,
+    so no vector is formatted as a string.
+
+    Args:
+        connection_string: PostgreSQL connection string, any driver name is replaced by asyncpg
+        pool_size: Connections kept open in the pool
+        max_overflow: Extra connections opened under load
+        pool_timeout: Seconds to wait for a free connection
+        pool_recycle: Seconds after which a connection is replaced
+        metadata_index_keys: Metadata keys commonly filtered on, each gets a btree expression index
+        storage: Representation the ANN index is built on, "vector", "halfvec" or "bit"
+    """
+
+    def __init__(self, connection_string: str, pool_size: int = 5, max_overflow: int = 10,
+                 pool_timeout: float = 30, pool_recycle: int = 1800, metadata_index_keys: Sequence[str] = (),
+                 storage: str = "vector"):
+        if storage not in VECTOR_STORAGE_MODES:
+            raise ValueError(f"Unsupported vector storage: {storage}")
+        self.storage = storage
+        self.metadata_index_keys = tuple(metadata_index_keys)
+        url = make_url(connection_string).set(drivername="postgresql+asyncpg")
+        self.engine = create_async_engine(
+            url,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=True
+        )
+
+    async def init(self, index_method: Optional[str] = "hnsw"):
+        """Create the extension, table and indexes if they do not exist.
+
+        Args:
+            index_method: ANN index created on the embedding column if none
+                exists, "hnsw", "ivfflat" or None for no index
+        """
+        async with AsyncSession(self.engine) as session:
+            for statement in SCHEMA_STATEMENTS:
+                await session.execute(text(statement))
+            for key in self.metadata_index_keys:
+                await session.execute(text(metadata_index_statement(key)))
+            if index_method is not None:
+                lists = 1
+                if index_method == "ivfflat":
+                    count = (await session.execute(text("SELECT count(*) FROM vector_store"))).scalar_one()
+                    lists = max(count // 1000, 1)
+                await session.execute(text(vector_index_statement(index_method, lists=lists, storage=self.storage)))
+            await session.commit()
+
+    async def close(self):
+        """Close every pooled connection."""
+        await self.engine.dispose()
+
+    async def add_vectors(self, vectors: List[np.ndarray], contents: List[str], metadata: Optional[List[dict]] = None,
+                          batch_size: int = 1000) -> List[int]:
+        """Add vectors to the database.
+
+        Ids are reserved from the id sequence up front and each batch of
+        `batch_size` rows is inserted by one INSERT ... SELECT over unnest'ed
+        arrays, all in a single transaction.
+
+        Args:
+            vectors: List of numpy arrays representing embeddings
+            contents: List of content strings associated with vectors
+            metadata: Optional list of metadata dictionaries
+            batch_size: Number of rows sent per statement
+
+        Returns:
+            List of ids assigned to the inserted rows, in input order
+        """
+        if metadata is None:
+            metadata = [{}] * len(vectors)
+        if len(vectors) == 0:
+            return []
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1]
+
+        async with AsyncSession(self.engine) as session:
+            result = await session.execute(text("""
+                SELECT nextval(pg_get_serial_sequence('vector_store', 'id')) FROM generate_series(1, :n);
+            """), {"n": len(vectors)})
+            ids = [row[0] for row in result]
+            for start in range(0, len(vectors), batch_size):
+                end = start + batch_size
+                # Row i takes elements (i - 1) * dim + 1 .. i * dim of the flattened embeddings
+                await session.execute(text("""
+                    INSERT INTO vector_store (id, content, embedding, metadata)
+                    SELECT t.id, t.content,
+                           CAST((CAST(:embeddings AS real[]))[(t.ord - 1) * :dim + 1:t.ord * :dim] AS vector),
+                           CAST(t.metadata AS jsonb)
+                    FROM unnest(CAST(:ids AS integer[]), CAST(:contents AS text[]), CAST(:metadata AS text[]))
+                         WITH ORDINALITY AS t(id, content, metadata, ord);
+                """), {
+                    "ids": ids[start:end],
+                    "contents": list(contents[start:end]),
+                    "metadata": [json.dumps(meta) for meta in metadata[start:end]],
+                    "embeddings": vectors[start:end].ravel().tolist(),
+                    "dim": dim
+                })
+            await session.commit()
+        return ids
+
+    async def search_vectors(self, query_vector: np.ndarray, k: int = 5, ef_search: Optional[int] = None,
+                             probes: Optional[int] = None, metadata_filter: Optional[Dict] = None,
+                             filter_strategy: str = "auto", candidates: Optional[int] = None) -> List[dict]:
+        """Search for similar vectors using cosine similarity.
+
+        Metadata filtering works as in `PGVector.search_vectors`.
+
+        Args:
+            query_vector: Query vector to search for
+            k: Number of results to return
+            ef_search: Optional HNSW candidate list size, higher trades latency for recall
+            probes: Optional number of IVFFlat lists scanned, higher trades latency for recall
+            metadata_filter: Optional key/value pairs the metadata must contain, e.g. {"tenant": "acme"}
+            filter_strategy: "auto", "pre" or "post"
+            candidates: Rows taken from the ANN index when post-filtering or
+                re-ranking halfvec/bit candidates (default: 10 * k)
+
+        Returns:
+            List of dictionaries containing search results
+        """
+        if filter_strategy not in METADATA_FILTER_STRATEGIES:
+            raise ValueError(f"Unsupported filter strategy: {filter_strategy}")
+        query_embedding = "CAST(CAST(:query_embedding AS real[]) AS vector)"
+        params = {
+            "query_embedding": np.asarray(query_vector, dtype=np.float32).tolist(),
+            "k": k,
+            "candidates": candidates or 10 * k
+        }
+        where = None
+        if metadata_filter:
+            where, filter_params = metadata_filter_sql(metadata_filter, self.metadata_index_keys)
+            params.update(filter_params)
+
+        async with AsyncSession(self.engine) as session:
+            strategy = filter_strategy
+            if where is not None and strategy == "auto":
+                plan = (await session.execute(
+                    text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM vector_store WHERE {where}"), params
+                )).scalar_one()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                strategy = choose_filter_strategy(plan[0]["Plan"]["Plan Rows"])
+            if where is not None and strategy == "post":
+                await self._set_search_params(session, ef_search, probes, limit=params["candidates"])
+                rows = (await session.execute(
+                    text(vector_search_sql(query_embedding, where, "post", self.storage)), params
+                )).all()
+                if len(rows) >= k or filter_strategy == "post":
+                    return [self._search_row(row) for row in rows]
+                strategy = "pre"
+            if where is not None:
+                # Rank the filtered rows exactly instead of filtering the ANN index's nearest rows
+                await session.execute(text("SELECT set_config('enable_indexscan', 'off', true);"))
+            else:
+                limit = k if self.storage == "vector" else params["candidates"]
+                await self._set_search_params(session, ef_search, probes, limit=limit)
+            results = await session.execute(text(vector_search_sql(query_embedding, where, strategy, self.storage)), params)
+            return [self._search_row(row) for row in results]
+
+    async def search_many(self, query_vectors: List[np.ndarray], k: int = 5,
+                          metadata_filter: Optional[Dict] = None, **kwargs) -> List[List[dict]]:
+        """Search several query vectors concurrently, each on its own pooled connection.
+
+        Args:
+            query_vectors: Query vectors to search for
+            k: Number of results per query
+            metadata_filter: Optional key/value pairs the metadata must contain
+            **kwargs: Further options of `search_vectors`
+
+        Returns:
+            One list of result dictionaries per query
+        """
+        return list(await asyncio.gather(*(
+            self.search_vectors(query_vector, k=k, metadata_filter=metadata_filter, **kwargs)
+            for query_vector in query_vectors
+        )))
+
+    # VectorStore protocol (see vectordb.vector_store)
+    add = add_vectors
+    search = search_vectors
+
+    @staticmethod
+    async def _set_search_params(session: AsyncSession, ef_search: Optional[int] = None, probes: Optional[int] = None,
+                                 limit: int = 0):
+        for setting, value in search_settings(ef_search, probes, limit):
+            await session.execute(text("SELECT set_config(:setting, :value, true);"), {"setting": setting, "value": value})
+
+    @staticmethod
+    def _search_row(row) -> dict:
+        return {
+            "id": row[0],
+            "content": row[1],
+            "metadata": row[2],
+            "similarity": float(row[3])
+        }
+
+    async def get_by_ids(self, ids: List[int]) -> List[dict]:
+        """Fetch rows by primary key.
+
+        Args:
+            ids: Ids of the rows to fetch
+
+        Returns:
+            List of dictionaries in the order of `ids`, missing ids are skipped
+        """
+        if not ids:
+            return []
+        async with AsyncSession(self.engine) as session:
+            results = await session.execute(text("""
+                SELECT id, content, metadata
+                FROM vector_store
+                WHERE id = ANY(CAST(:ids AS integer[]));
+            """), {"ids": list(ids)})
+            rows = {row[0]: {"id": row[0], "content": row[1], "metadata": row[2]} for row in results}
+        return [rows[i] for i in ids if i in rows]
+
+    async def delete(self, ids: List[int]) -> int:
+        """Delete rows by primary key.
+
+        Args:
+            ids: Ids of the rows to delete
+
+        Returns:
+            Number of deleted rows
+        """
+        if not ids:
+            return 0
+        async with AsyncSession(self.engine) as session:
+            result = await session.execute(
+                text("DELETE FROM vector_store WHERE id = ANY(CAST(:ids AS integer[]));"), {"ids": list(ids)}
+            )
+            await session.commit()
+            return result.rowcount
+
+    async def get_all_documents(self) -> List[dict]:
+        """Fetch the id and content of every row, without embeddings."""
+        async with AsyncSession(self.engine) as session:
+            results = await session.execute(text("SELECT id, content FROM vector_store ORDER BY id"))
+            return [{"id": row[0], "content": row[1]} for row in results]
+
+    async def get_all_ids(self) -> List[int]:
+        """Fetch the id of every row."""
+        async with AsyncSession(self.engine) as session:
+            return list((await session.execute(text("SELECT id FROM vector_store ORDER BY id"))).scalars())
+
+    async def count(self) -> int:
+        """Return the number of stored rows."""
+        async with AsyncSession(self.engine) as session:
+            return (await session.execute(text("SELECT count(*) FROM vector_store"))).scalar_one()
@@ -0,0 +1,388 @@
+import os
+import math
+import heapq
+import threading
+import numpy as np
+from typing import List, Optional, Tuple
+from vectordb.inmemory import InMemoryVectorStore
+
+
+class HNSWIndex:
+    """
+    Hierarchical Navigable Small World graph for approximate cosine search.
+
+    Vectors are L2-normalized on insert and stored in a float32 matrix, so
+    similarity is a dot product. Every node gets a random level from an
+    exponential distribution; a query descends greedily through the sparse
+    upper layers and runs a best-first search with a candidate list of
+    `ef_search` on layer 0. Neighbour lists are chosen with the diversity
+    heuristic of Malkov & Yashunin and hold at most m (2 * m on layer 0)
+    links. The similarities of a node's unvisited neighbours are computed
+    with one matmul per expansion.
+
+    Parameters:
+    - dim: Dimension of the vectors
+    - m: Links per node on the upper layers, 2 * m on layer 0 (default: 16)
+    - ef_construction: Candidate list size while inserting (default: 200)
+    - ef_search: Default candidate list size while searching (default: 50)
+    - seed: Seed of the level generator
+    - capacity: Initial number of rows allocated, doubled when full
+    """
+
+    def __init__(self, dim: int, m: int = 16, ef_construction: int = 200, ef_search: int = 50,
+                 seed: int = 0, capacity: int = 1024):
+        self.dim = dim
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.seed = seed
+        self.level_mult = 1 / math.log(m)
+        self.ids: List[int] = []
+        self.levels: List[int] = []
+        # links[node][level] is the neighbour list of node on that level
+        self.links: List[List[List[int]]] = []
+        self.entry_point = -1
+        self.max_level = -1
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _similarities(self, query: np.ndarray, nodes: List[int]) -> np.ndarray:
+        return self._vectors[nodes] @ query
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        """Best-first search of one layer, returns up to ef (similarity, node) pairs, most similar first."""
+        visited = set(entry_points)
+        similarities = self._similarities(query, entry_points).tolist()
+        # Max-heap of nodes to expand and min-heap of the ef best nodes found
+        candidates = [(-similarity, node) for similarity, node in zip(similarities, entry_points)]
+        heapq.heapify(candidates)
+        results = heapq.nlargest(ef, zip(similarities, entry_points))
+        heapq.heapify(results)
+
+        while candidates:
+            similarity, node = heapq.heappop(candidates)
+            if -similarity < results[0][0] and len(results) >= ef:
+                break
+            neighbors = [neighbor for neighbor in self.links[node][level] if neighbor not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            for similarity, neighbor in zip(self._similarities(query, neighbors).tolist(), neighbors):
+                if len(results) < ef or similarity > results[0][0]:
+                    heapq.heappush(candidates, (-similarity, neighbor))
+                    heapq.heappush(results, (similarity, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], m: int) -> List[int]:
+        """
+        Pick up to m diverse neighbours from candidates sorted by similarity.
+
+        A candidate is kept only if it is closer to the base node than to every
+        neighbour already kept, so links spread out in different directions.
+        """
+        if len(candidates) <= 1:
+            return [node for _, node in candidates]
+        vectors = self._vectors[[node for _, node in candidates]]
+        pairwise = vectors @ vectors.T
+        selected: List[int] = []
+        for position, (similarity, _) in enumerate(candidates):
+            if len(selected) >= m:
+                break
+            if not selected or (pairwise[position, selected] < similarity).all():
+                selected.append(position)
+        return [candidates[position][1] for position in selected]
+
+    def _insert(self, node: int):
+        vector = self._vectors[node]
+        level = int(-math.log(1.0 - self._rng.random()) * self.level_mult)
+        self.levels.append(level)
+        self.links.append([[] for _ in range(level + 1)])
+        if self.entry_point < 0:
+            self.entry_point, self.max_level = node, level
+            return
+
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, level, -1):
+            entry_points = [self._search_layer(vector, entry_points, 1, layer)[0][1]]
+
+        for layer in range(min(level, self.max_level), -1, -1):
+            candidates = self._search_layer(vector, entry_points, self.ef_construction, layer)
+            max_links = 2 * self.m if layer == 0 else self.m
+            neighbors = self._select_neighbors(candidates, self.m)
+            self.links[node][layer] = neighbors
+            for neighbor in neighbors:
+                links = self.links[neighbor][layer] + [node]
+                if len(links) > max_links:
+                    similarities = self._similarities(self._vectors[neighbor], links).tolist()
+                    links = self._select_neighbors(sorted(zip(similarities, links), reverse=True), max_links)
+                # Swap in a new list so concurrent searches never see a half-pruned one
+                self.links[neighbor][layer] = links
+            entry_points = [node for _, node in candidates]
+
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def add(self, vectors: List[np.ndarray], ids: Optional[List[int]] = None) -> List[int]:
+        """
+        Build or extend the index.
+
+        Args:
+            vectors: Vectors to insert
+            ids: Ids returned by search for the vectors (default: insertion positions)
+
+        Returns:
+            List of ids of the inserted vectors
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            start = len(self.ids)
+            if ids is None:
+                ids = list(range(start, start + len(vectors)))
+            end = start + len(vectors)
+            if end > len(self._vectors):
+                grown = np.zeros((max(end, 2 * len(self._vectors)), self.dim), dtype=np.float32)
+                grown[:start] = self._vectors[:start]
+                self._vectors = grown
+            self._vectors[start:end] = vectors
+            for node, doc_id in enumerate(ids, start=start):
+                self.ids.append(doc_id)
+                self._insert(node)
+        return list(ids)
+
+    def search(self, query_vector: np.ndarray, k: int = 10, ef_search: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Approximate cosine top-k search.
+
+        Args:
+            query_vector: Query vector
+            k: Number of results to return
+            ef_search: Candidate list size, trading latency for recall (default: self.ef_search)
+
+        Returns:
+            List of (id, similarity) tuples, most similar first
+        """
+        if self.entry_point < 0 or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32).reshape(self.dim)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        entry_points = [self.entry_point]
+        for layer in range(self.max_level, 0, -1):
+            entry_points = [self._search_layer(query, entry_points, 1, layer)[0][1]]
+        ef = max(ef_search or self.ef_search, k)
+        results = self._search_layer(query, entry_points, ef, 0)[:k]
+        return [(self.ids[node], similarity) for similarity, node in results]
+
+    def save(self, path: str, include_vectors: bool = True):
+        """
+        Write the index to an .npz file.
+
+        The file is written next to `path` and renamed over it, so readers
+        either see the previous index or the complete new one. Neighbour
+        lists are flattened node by node, level by level.
+
+        Args:
+            path: Index file path
+            include_vectors: Whether to write the vectors too; without them only
+                the graph is written and `load` must be given the vectors
+        """
+        with self._lock:
+            size = len(self.ids)
+            link_counts = [len(links) for node_links in self.links for links in node_links]
+            flat_links = [neighbor for node_links in self.links for links in node_links for neighbor in links]
+            arrays = {
+                "params": np.array([self.dim, self.m, self.ef_construction, self.ef_search, self.seed,
+                                    self.entry_point, self.max_level], dtype=np.int64),
+                "ids": np.array(self.ids, dtype=np.int64),
+                "levels": np.array(self.levels, dtype=np.int32),
+                "link_counts": np.array(link_counts, dtype=np.int32),
+                "links": np.array(flat_links, dtype=np.int32),
+            }
+            if include_vectors:
+                arrays["vectors"] = self._vectors[:size]
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, vectors: Optional[np.ndarray] = None) -> "HNSWIndex":
+        """
+        Read an index written by `save`.
+
+        Args:
+            path: Index file path
+            vectors: Vectors of the nodes in insertion order, required if the file
+                was written without them; only the first len(index) rows are used
+
+        Returns:
+            The loaded HNSWIndex
+        """
+        with np.load(path) as data:
+            dim, m, ef_construction, ef_search, seed, entry_point, max_level = data["params"].tolist()
+            size = len(data["ids"])
+            index = cls(dim, m=m, ef_construction=ef_construction, ef_search=ef_search, seed=seed,
+                        capacity=max(size, 1))
+            if vectors is None:
+                index._vectors[:size] = data["vectors"]
+            elif len(vectors) < size:
+                raise ValueError(f"The index has {size} nodes but only {len(vectors)} vectors were given")
+            else:
+                norms = np.linalg.norm(vectors[:size], axis=1, keepdims=True)
+                index._vectors[:size] = vectors[:size] / np.where(norms == 0, 1, norms)
+            index.ids = data["ids"].tolist()
+            index.levels = data["levels"].tolist()
+            link_counts = data["link_counts"].tolist()
+            flat_links = data["links"].tolist()
+        index.entry_point, index.max_level = entry_point, max_level
+        # Continue with levels independent of the ones already drawn
+        index._rng = np.random.default_rng([seed, len(index.ids)])
+
+        position = offset = 0
+        for level in index.levels:
+            node_links = []
+            for count in link_counts[position:position + level + 1]:
+                node_links.append(flat_links[offset:offset + count])
+                offset += count
+            index.links.append(node_links)
+            position += level + 1
+        return index
+
+
+class HNSWVectorStore(InMemoryVectorStore):
+    """
+    InMemoryVectorStore answering searches from an HNSW graph instead of a full scan.
+
+    Rows, persistence and get_by_ids are inherited; the graph is keyed by row
+    position. With a `path`, `save` (or `close`) writes the graph, without the
+    vectors, to `hnsw.npz` next to the matrix. On open the saved graph is
+    reused and the rows added after it was saved are linked in; a delete
+    removes the file, and a graph that does not match the rows is rebuilt.
+
+    Args:
+        dim: Dimension of the vectors
+        path: Optional directory holding the memory-mapped store
+        capacity: Initial number of rows allocated, doubled when full
+        m: Links per node (default: 16)
+        ef_construction: Candidate list size while inserting (default: 200)
+        ef_search: Candidate list size while searching (default: 50)
+    """
+
+    def __init__(self, dim: int = 1536, path: Optional[str] = None, capacity: int = 1024,
+                 m: int = 16, ef_construction: int = 200, ef_search: int = 50):
+        super().__init__(dim=dim, path=path, capacity=capacity)
+        # Serializes graph updates, so rows are linked in the order they were appended
+        self._index_lock = threading.Lock()
+        if path is not None and os.path.exists(self._index_path):
+            with np.load(self._index_path) as data:
+                size = len(data["ids"])
+            if size <= len(self.ids):
+                self.index = HNSWIndex.load(self._index_path, vectors=self._vectors)
+                self.index.ef_search = ef_search
+                self.index.add(self._vectors[size:len(self.ids)])
+                return
+        self.index = HNSWIndex(dim, m=m, ef_construction=ef_construction, ef_search=ef_search, capacity=capacity)
+        if self.ids:
+            self.index.add(self._vectors[:len(self.ids)])
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.path, "hnsw.npz")
+
+    def save(self):
+        """Write the graph to `hnsw.npz`, a no-op without a `path`."""
+        if self.path is not None:
+            with self._index_lock:
+                self.index.save(self._index_path, include_vectors=False)
+
+    def close(self):
+        """Save the graph, see `save`."""
+        self.save()
+
+    def add_vectors(self, vectors: List[np.ndarray], contents: List[str], metadata: Optional[List[dict]] = None) -> List[int]:
+        """Add vectors to the store and link them into the graph.
+
+        Args:
+            vectors: List of numpy arrays representing embeddings
+            contents: List of content strings associated with vectors
+            metadata: Optional list of metadata dictionaries
+
+        Returns:
+            List of ids assigned to the inserted rows, in input order
+        """
+        if metadata is None:
+            metadata = [{}] * len(vectors)
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        # Rows and graph nodes must be appended in the same order, so both happen under
+        # the index lock; searches only wait for the rows, not for linking them
+        with self._index_lock:
+            with self._lock:
+                start, ids = self._append_rows(vectors, contents, metadata)
+                vectors = self._vectors[start:start + len(ids)]
+            self.index.add(vectors)
+        return ids
+
+    def delete(self, ids: List[int]) -> int:
+        """Delete rows by id and rebuild the graph over the remaining rows.
+
+        Args:
+            ids: Ids of the rows to delete
+
+        Returns:
+            Number of deleted rows
+        """
+        with self._index_lock, self._lock:
+            deleted = self._compact(ids)
+            if deleted:
+                index = self.index
+                self.index = HNSWIndex(self.dim, m=index.m, ef_construction=index.ef_construction,
+                                       ef_search=index.ef_search, seed=index.seed, capacity=max(len(self.ids), 1))
+                self.index.add(self._vectors[:len(self.ids)])
+                # The saved graph is keyed by the old row positions
+                if self.path is not None and os.path.exists(self._index_path):
+                    os.remove(self._index_path)
+        return deleted
+
+    def search_batch(self, query_vectors: List[np.ndarray], k: int = 5, ef_search: Optional[int] = None,
+                     metadata_filter: Optional[dict] = None) -> List[List[dict]]:
+        """Approximate search for several queries.
+
+        Searches with a metadata filter are exact over the matching rows, as
+        the graph cannot skip non-matching nodes without losing recall.
+
+        Args:
+            query_vectors: Query vectors to search for
+            k: Number of results to return per query
+            ef_search: Optional candidate list size overriding the index default
+            metadata_filter: Optional key/value pairs the metadata of results must contain
+
+        Returns:
+            One list of result dictionaries per query, most similar first
+        """
+        if metadata_filter:
+            return super().search_batch(query_vectors, k=k, metadata_filter=metadata_filter)
+        queries = np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dim)
+        # A delete swaps the graph and the rows together
+        with self._lock:
+            index, rows = self.index, self._snapshot()
+        size = len(rows[0])
+        return [
+            [
+                self._row(rows, position, similarity)
+                for position, similarity in index.search(query, k=k, ef_search=ef_search)
+                # Rows appended after the snapshot may already be linked
+                if position < size
+            ]
+            for query in queries
+        ]
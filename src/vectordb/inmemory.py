@@ -0,0 +1,290 @@
+import os
+import json
+import bisect
+import threading
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+class InMemoryVectorStore:
+    """
+    Exact in-process vector store on a contiguous float32 matrix.
+
+    Embeddings are L2-normalized on insert, so cosine similarity against a
+    normalized query is a single matmul and the top k are selected with
+    argpartition. Offers the same add/search surface as PGVector.
+
+    With a `path`, the matrix lives in `embeddings.npy` opened with
+    np.lib.format.open_memmap and contents/metadata are appended to
+    `documents.jsonl`, so the store survives restarts and is paged in by the
+    OS instead of being loaded into process memory.
+    """
+
+    def __init__(self, dim: int = 1536, path: Optional[str] = None, capacity: int = 1024):
+        """Initialize the store.
+
+        Args:
+            dim: Dimension of the vectors
+            path: Optional directory holding the memory-mapped store
+            capacity: Initial number of rows allocated, doubled when full
+        """
+        self.dim = dim
+        self.path = path
+        self.ids: List[int] = []
+        self.contents: List[str] = []
+        self.metadata: List[dict] = []
+        # Reentrant so subclasses can read a snapshot while holding it
+        self._lock = threading.RLock()
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._load(capacity)
+        else:
+            self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+
+    @property
+    def _embeddings_path(self) -> str:
+        return os.path.join(self.path, "embeddings.npy")
+
+    @property
+    def _documents_path(self) -> str:
+        return os.path.join(self.path, "documents.jsonl")
+
+    def _load(self, capacity: int):
+        """Open the memory-mapped matrix and read the document rows."""
+        if os.path.exists(self._documents_path):
+            with open(self._documents_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    row = json.loads(line)
+                    self.ids.append(row["id"])
+                    self.contents.append(row["content"])
+                    self.metadata.append(row["metadata"])
+        if os.path.exists(self._embeddings_path):
+            self._vectors = np.lib.format.open_memmap(self._embeddings_path, mode="r+")
+            if self._vectors.shape[1] != self.dim:
+                raise ValueError(f"Store at {self.path} has dimension {self._vectors.shape[1]}, expected {self.dim}")
+        else:
+            self._vectors = np.lib.format.open_memmap(
+                self._embeddings_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+            )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def count(self) -> int:
+        """Return the number of stored vectors."""
+        return len(self.ids)
+
+    def _grow(self, size: int):
+        """Reallocate the matrix so that it holds at least `size` rows."""
+        capacity = max(size, 2 * len(self._vectors))
+        if self.path is None:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            vectors[:len(self.ids)] = self._vectors[:len(self.ids)]
+            self._vectors = vectors
+            return
+        tmp_path = f"{self._embeddings_path}.tmp"
+        vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        vectors[:len(self.ids)] = self._vectors[:len(self.ids)]
+        vectors.flush()
+        del vectors
+        os.replace(tmp_path, self._embeddings_path)
+        self._vectors = np.lib.format.open_memmap(self._embeddings_path, mode="r+")
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def add_vectors(self, vectors: List[np.ndarray], contents: List[str], metadata: Optional[List[dict]] = None) -> List[int]:
+        """Add vectors to the store.
+
+        Args:
+            vectors: List of numpy arrays representing embeddings
+            contents: List of content strings associated with vectors
+            metadata: Optional list of metadata dictionaries
+
+        Returns:
+            List of ids assigned to the inserted rows, in input order
+        """
+        if metadata is None:
+            metadata = [{}] * len(vectors)
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        with self._lock:
+            _, ids = self._append_rows(vectors, contents, metadata)
+        return ids
+
+    def _append_rows(self, vectors: np.ndarray, contents: List[str], metadata: List[dict]) -> Tuple[int, List[int]]:
+        """Append normalized rows, called with `_lock` held; returns the start position and the new ids."""
+        start = len(self.ids)
+        end = start + len(vectors)
+        if end > len(self._vectors):
+            self._grow(end)
+        self._vectors[start:end] = vectors
+
+        first_id = self.ids[-1] + 1 if self.ids else 1
+        ids = list(range(first_id, first_id + len(vectors)))
+        if self.path is not None:
+            self._vectors.flush()
+            with open(self._documents_path, "a", encoding="utf-8") as f:
+                for doc_id, content, meta in zip(ids, contents, metadata):
+                    f.write(json.dumps({"id": doc_id, "content": content, "metadata": meta}) + "\n")
+        self.contents.extend(contents)
+        self.metadata.extend(metadata)
+        # Publish the ids last, searches only read the first len(ids) rows
+        self.ids.extend(ids)
+        return start, ids
+
+    def _snapshot(self) -> Tuple[np.ndarray, List[int], List[str], List[dict]]:
+        """
+        The stored rows as (vectors, ids, contents, metadata), read under `_lock`.
+
+        `delete` swaps in new arrays and lists, so readers take all of them
+        from one snapshot instead of mixing old and new. Appends only extend
+        the lists, so the first len(vectors) entries of a snapshot stay valid.
+        """
+        with self._lock:
+            return self._vectors[:len(self.ids)], self.ids, self.contents, self.metadata
+
+    @staticmethod
+    def _row(rows: Tuple[np.ndarray, List[int], List[str], List[dict]], position: int, similarity: float) -> dict:
+        _, ids, contents, metadata = rows
+        return {
+            "id": ids[position],
+            "content": contents[position],
+            "metadata": metadata[position],
+            "similarity": similarity
+        }
+
+    @staticmethod
+    def _matching_positions(metadata: List[dict], metadata_filter: dict, size: int) -> np.ndarray:
+        """Positions among the first `size` rows whose metadata contains every key/value pair of the filter."""
+        return np.array([
+            pos for pos in range(size)
+            if all(metadata[pos].get(key) == value for key, value in metadata_filter.items())
+        ], dtype=np.int64)
+
+    def search_batch(self, query_vectors: List[np.ndarray], k: int = 5, block_bytes: int = 64 << 20,
+                     metadata_filter: Optional[dict] = None) -> List[List[dict]]:
+        """Search for the most similar vectors of several queries at once.
+
+        Args:
+            query_vectors: Query vectors to search for
+            k: Number of results to return per query
+            block_bytes: Upper bound of the similarity block computed at once
+            metadata_filter: Optional key/value pairs the metadata must contain,
+                only matching rows are ranked
+
+        Returns:
+            One list of result dictionaries per query, most similar first
+        """
+        queries = self._normalize(np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dim))
+        rows = self._snapshot()
+        matrix = rows[0]
+        size = len(matrix)
+        positions = None
+        if metadata_filter:
+            positions = self._matching_positions(rows[3], metadata_filter, size)
+            matrix = matrix[positions]
+            size = len(positions)
+        if size == 0 or k <= 0:
+            return [[] for _ in range(len(queries))]
+        k = min(k, size)
+        rows_per_block = max(1, block_bytes // (4 * size))
+
+        results = []
+        for start in range(0, len(queries), rows_per_block):
+            similarities = queries[start:start + rows_per_block] @ matrix.T
+            if k < size:
+                top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(size), similarities.shape)
+            top_scores = np.take_along_axis(similarities, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            if positions is not None:
+                top = positions[top]
+            for row_positions, scores in zip(top, top_scores):
+                results.append([self._row(rows, int(pos), float(score)) for pos, score in zip(row_positions, scores)])
+        return results
+
+    def search_vectors(self, query_vector: np.ndarray, k: int = 5) -> List[dict]:
+        """Search for similar vectors using cosine similarity.
+
+        Args:
+            query_vector: Query vector to search for
+            k: Number of results to return
+
+        Returns:
+            List of dictionaries containing search results
+        """
+        return self.search_batch([query_vector], k=k)[0]
+
+    def delete(self, ids: List[int]) -> int:
+        """Delete rows by id and compact the matrix.
+
+        The remaining rows are copied into a new matrix (and, with a `path`,
+        new files that replace the old ones), so deleting is O(n); it is meant
+        for occasional removals such as re-uploading a document.
+
+        Args:
+            ids: Ids of the rows to delete
+
+        Returns:
+            Number of deleted rows
+        """
+        with self._lock:
+            return self._compact(ids)
+
+    def _compact(self, ids: List[int]) -> int:
+        """Remove the rows of `ids`, called with `_lock` held; returns the number of removed rows."""
+        removed = set(ids)
+        keep = [pos for pos, doc_id in enumerate(self.ids) if doc_id not in removed]
+        if len(keep) == len(self.ids):
+            return 0
+        deleted = len(self.ids) - len(keep)
+        capacity = max(len(keep), 1)
+        if self.path is None:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        else:
+            tmp_path = f"{self._embeddings_path}.tmp"
+            vectors = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        vectors[:len(keep)] = self._vectors[keep]
+        ids = [self.ids[pos] for pos in keep]
+        contents = [self.contents[pos] for pos in keep]
+        metadata = [self.metadata[pos] for pos in keep]
+        if self.path is not None:
+            vectors.flush()
+            del vectors
+            os.replace(tmp_path, self._embeddings_path)
+            vectors = np.lib.format.open_memmap(self._embeddings_path, mode="r+")
+            tmp_path = f"{self._documents_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for doc_id, content, meta in zip(ids, contents, metadata):
+                    f.write(json.dumps({"id": doc_id, "content": content, "metadata": meta}) + "\n")
+            os.replace(tmp_path, self._documents_path)
+        self._vectors, self.ids, self.contents, self.metadata = vectors, ids, contents, metadata
+        return deleted
+
+    def get_by_ids(self, ids: List[int]) -> List[dict]:
+        """Fetch rows by id, in the order of `ids`, skipping unknown ids."""
+        vectors, stored_ids, contents, metadata = self._snapshot()
+        size = len(vectors)
+        rows = []
+        for doc_id in ids:
+            # Ids are assigned in increasing order
+            pos = bisect.bisect_left(stored_ids, doc_id, 0, size)
+            if pos < size and stored_ids[pos] == doc_id:
+                rows.append({"id": doc_id, "content": contents[pos], "metadata": metadata[pos]})
+        return rows
+
+    def get_all_ids(self) -> List[int]:
+        """Return the id of every row."""
+        vectors, ids, _, _ = self._snapshot()
+        return ids[:len(vectors)]
+
+    def get_all_documents(self) -> List[dict]:
+        """Return the id and content of every row."""
+        vectors, ids, contents, _ = self._snapshot()
+        return [{"id": doc_id, "content": content} for doc_id, content in zip(ids[:len(vectors)], contents)]
@@ -6,22 +6,124 @@ from pymilvus import (
     FieldSchema,
     DataType,
 )
+import json
+import os
+import re
 import numpy as np
-from typing import List, Optional, Dict, Any
+from collections import deque
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Tuple
+
+# Bytes per row on top of the vector, text and metadata payload (primary key, field framing)
+ROW_OVERHEAD_BYTES = 64
+
+# Supported vector indexes and their default build parameters
+INDEX_BUILD_PARAMS = {
+    "HNSW": {"M": 16, "efConstruction": 200},
+    "IVF_FLAT": {"nlist": 1024},
+    "IVF_SQ8": {"nlist": 1024},
+    "FLAT": {},
+}
+METRIC_TYPES = ("L2", "IP", "COSINE")
+METADATA_KEY_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def is_milvus_lite(uri: str) -> bool:
+    """Whether `uri` is a local milvus-lite database file rather than a server address."""
+    return uri.endswith(".db")
+
+
+def metadata_filter_expr(metadata_filter: Dict[str, Any]) -> str:
+    """Milvus boolean expression matching rows whose metadata has every key/value pair of `metadata_filter`.
+
+    Args:
+        metadata_filter: Scalar key/value pairs, e.g. {"source": "report.pdf", "page": 3}
+    """
+    conditions = []
+    for key, value in metadata_filter.items():
+        if not METADATA_KEY_PATTERN.match(key):
+            raise ValueError(f"Invalid metadata key: {key}")
+        if value is not None and not isinstance(value, (str, int, float, bool)):
+            raise ValueError(f"Unsupported metadata filter value for {key}: {value!r}")
+        if value is None:
+            conditions.append(f'metadata["{key}"] is null')
+            continue
+        # JSON literals are valid Milvus literals, json.dumps escapes quotes in strings;
+        # non-ASCII characters are kept as is since Milvus rejects \u escapes
+        conditions.append(f'metadata["{key}"] == {json.dumps(value, ensure_ascii=False)}')
+    return " and ".join(conditions)
+
+
+def search_params(index_type: str, metric_type: str, k: int, ef: Optional[int] = None,
+                  nprobe: Optional[int] = None) -> Dict[str, Any]:
+    """Search parameters of a query on an index of `index_type`.
+
+    Args:
+        index_type: Index type of the embedding field, see INDEX_BUILD_PARAMS
+        metric_type: Metric the index was built with
+        k: Number of results per query, HNSW needs ef >= k
+        ef: Optional HNSW candidate list size (default: max(64, k))
+        nprobe: Optional number of IVF lists scanned (default: 16)
+    """
+    if index_type == "HNSW":
+        params = {"ef": max(ef or 64, k)}
+    elif index_type.startswith("IVF"):
+        params = {"nprobe": nprobe or 16}
+    else:
+        params = {}
+    return {"metric_type": metric_type, "params": params}
+
 
 class MilvusVectorDB:
-    def __init__(self, collection_name: str, dim: int):
+    """
+    Milvus collection of text chunks, their embeddings and metadata.
+
+    The index is only created with a new collection; an existing collection
+    keeps its index and metric, which are read back from the server.
+
+    `uri` is either a Milvus server address ("http://host:19530") or the path
+    of a local ".db" file, which runs the embedded milvus-lite engine in
+    process with no server to deploy (single node, for development, tests
+    and small deployments).
+
+    Args:
+        collection_name: Name of the collection
+        dim: Dimension of the embeddings
+        uri: Milvus server address or milvus-lite database file
+        alias: Connection alias, shared with other stores using the same alias
+        index_type: Vector index of a new collection, one of INDEX_BUILD_PARAMS
+        metric_type: Metric of a new collection, "L2", "IP" or "COSINE"
+        index_params: Optional build parameters overriding INDEX_BUILD_PARAMS[index_type]
+    """
+
+    def __init__(self, collection_name: str, dim: int, uri: str = "http://localhost:19530", alias: str = "default",
+                 index_type: str = "IVF_FLAT",
+                 metric_type: str = "L2", index_params: Optional[Dict[str, Any]] = None):
+        if index_type not in INDEX_BUILD_PARAMS:
+            raise ValueError(f"Unsupported index type: {index_type}")
+        if metric_type not in METRIC_TYPES:
+            raise ValueError(f"Unsupported metric type: {metric_type}")
         self.collection_name = collection_name
         self.dim = dim  # OpenAI embedding dimension
+        self.uri = uri
+        self.alias = alias
+        self.index_type = index_type
+        self.metric_type = metric_type
+        self.index_params = {**INDEX_BUILD_PARAMS[index_type], **(index_params or {})}
+        self._loaded = False
         self.connect()
         self._create_collection()
 
     def connect(self):
+        """Connect under `alias`, reusing the connection if it is already open."""
+        if connections.has_connection(self.alias):
+            return
+        if is_milvus_lite(self.uri):
+            # milvus-lite creates the database file but not its directory
+            os.makedirs(os.path.dirname(os.path.abspath(self.uri)), exist_ok=True)
         try:
             connections.connect(
-                alias="default",
-                host="localhost",
-                port="19530",
+                alias=self.alias,
+                uri=self.uri,
                 timeout=10  # Add timeout
             )
         except Exception as e:
@@ -29,7 +131,7 @@ class MilvusVectorDB:
             raise
 
     def _create_collection(self):
-        if self.collection_name not in utility.list_collections():
+        if self.collection_name not in utility.list_collections(using=self.alias):
             fields = [
                 FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
                 FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
@@ -37,114 +139,232 @@ class MilvusVectorDB:
                 FieldSchema(name="metadata", dtype=DataType.JSON)  # Add metadata field
             ]
             schema = CollectionSchema(fields=fields)
-            self.collection = Collection(name=self.collection_name, schema=schema)
+            self.collection = Collection(name=self.collection_name, schema=schema, using=self.alias)
             
             # Create index for vector field
             index_params = {
-                "metric_type": "L2",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 1024}
+                "metric_type": self.metric_type,
+                "index_type": self.index_type,
+                "params": self.index_params
             }
             self.collection.create_index(field_name="embedding", index_params=index_params)
         else:
-            self.collection = Collection(self.collection_name)
+            self.collection = Collection(self.collection_name, using=self.alias)
+            for index in self.collection.indexes:
+                if index.field_name == "embedding":
+                    self.index_type = index.params.get("index_type", self.index_type)
+                    self.metric_type = index.params.get("metric_type", self.metric_type)
+
+    def load(self):
+        """Load the collection into memory once, later inserts are searchable without reloading"""
+        if not self._loaded:
+            self.collection.load()
+            self._loaded = True
     
 
-    def add_documents(self, texts, embeddings, batch_size=1):
+    def _batches(self, texts: List[str], embeddings: np.ndarray, metadata: List[dict],
+                 batch_rows: int, batch_bytes: int) -> Iterator[Tuple[int, int]]:
+        """Split rows into (start, end) slices of at most `batch_rows` rows and about `batch_bytes` bytes."""
+        vector_bytes = embeddings.itemsize * self.dim + ROW_OVERHEAD_BYTES
+        start = size = 0
+        for i, (text, meta) in enumerate(zip(texts, metadata)):
+            row_bytes = vector_bytes + len(text.encode("utf-8")) + len(json.dumps(meta))
+            if i > start and (i - start >= batch_rows or size + row_bytes > batch_bytes):
+                yield start, i
+                start, size = i, 0
+            size += row_bytes
+        if start < len(texts):
+            yield start, len(texts)
+
+    def add_document_batches(self, batches: Iterable[Tuple[List[str], List[List[float]], Optional[List[dict]]]],
+                             batch_rows: int = 1000, batch_bytes: int = 8 << 20, max_inflight: int = 2) -> List[int]:
+        """
+        Insert a stream of (texts, embeddings, metadata) batches as one ingestion job.
+
+        Batches are consumed lazily, so embeddings of the next batch can be
+        generated while earlier inserts are still in flight. Each batch is
+        re-split by row count and payload bytes, inserts run asynchronously
+        with at most `max_inflight` pending, and the collection is flushed
+        once at the end.
+
+        Args:
+            batches: Iterable of (texts, embeddings, metadata or None)
+            batch_rows: Maximum rows per insert call
+            batch_bytes: Approximate maximum payload bytes per insert call
+            max_inflight: Maximum number of pending insert calls
+
+        Returns:
+            Primary keys of the inserted rows, in input order
+        """
+        ids: List[int] = []
+        pending = deque()
         try:
-            # Convert embeddings to numpy array if needed
-            if not isinstance(embeddings, np.ndarray):
-                embeddings = np.array(embeddings)
-            
-            # Prepare data in batches
-            total_docs = len(texts)
-            for i in range(0, total_docs, batch_size):
-                end_idx = min(i + batch_size, total_docs)
-                batch_texts = texts[i:end_idx]
-                batch_embeddings = embeddings[i:end_idx]
-                
-                entities = [
-                    batch_texts,
-                    batch_embeddings.tolist(),
-                    [{}] * len(batch_texts)  # Add empty metadata for each document
-                ]
-                self.collection.insert(entities)
-                print(f"Inserted {len(batch_texts)} documents")
-
-            # Flush after batch insertion
+            for texts, embeddings, metadata in batches:
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+                if metadata is None:
+                    metadata = [{}] * len(texts)
+                for start, end in self._batches(texts, embeddings, metadata, batch_rows, batch_bytes):
+                    if len(pending) >= max_inflight:
+                        ids.extend(pending.popleft().result().primary_keys)
+                    pending.append(self.collection.insert(
+                        [texts[start:end], embeddings[start:end], metadata[start:end]], _async=True
+                    ))
+            while pending:
+                ids.extend(pending.popleft().result().primary_keys)
+
+            # One flush per ingestion job
             self.collection.flush()
-            return True
-            
+            print(f"Inserted {len(ids)} documents")
+            return ids
+
         except Exception as e:
             print(f"Error inserting documents: {e}")
-            return False
+            raise
 
-    def similarity_search(
+    def add_documents(self, texts: List[str], embeddings, metadata: Optional[List[dict]] = None,
+                      batch_rows: int = 1000, batch_bytes: int = 8 << 20) -> List[int]:
+        """
+        Insert documents, batched by row count and payload bytes, and flush once.
+
+        Args:
+            texts: Document texts
+            embeddings: Embeddings of the texts
+            metadata: Optional metadata dictionaries
+            batch_rows: Maximum rows per insert call
+            batch_bytes: Approximate maximum payload bytes per insert call
+
+        Returns:
+            Primary keys of the inserted rows, in input order
+        """
+        return self.add_document_batches([(texts, embeddings, metadata)], batch_rows=batch_rows, batch_bytes=batch_bytes)
+
+    def search_many(
         self,
-        query_vector: List[float],
+        query_vectors,
         k: int = 4,
-        metadata_filter: Optional[Dict[str, Any]] = None
-    ) -> List[Dict[str, Any]]:
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        expr: Optional[str] = None,
+        ef: Optional[int] = None,
+        nprobe: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
         """
-        Search for similar vectors and return top k results
+        Search for the top k results of several query vectors in one request.
+
+        Args:
+            query_vectors: Query vectors, one row per query
+            k: Number of results per query
+            metadata_filter: Optional scalar key/value pairs the metadata must match
+            expr: Optional Milvus boolean expression, combined with metadata_filter
+            ef: Optional HNSW candidate list size
+            nprobe: Optional number of IVF lists scanned
+
+        Returns:
+            One list of hits per query, each hit with text, metadata, score and id
         """
-        self.collection.load()
-        
-        # search_params = {
-        #     "metric_type": "COSINE",
-        #     "params": {"nprobe": 10}
-        # }
-
-        expr = None
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        if query_vectors.ndim == 1:
+            query_vectors = query_vectors[None, :]
+        if len(query_vectors) == 0:
+            return []
+        self.load()
+
+        conditions = []
+        if expr:
+            conditions.append(f"({expr})")
         if metadata_filter:
-            # Convert metadata filter to Milvus expression
-            expr = " and ".join([f"metadata['{k}'] == '{v}'" for k, v in metadata_filter.items()])
-
-        # results = self.collection.search(
-        #     data=[query_vector],
-        #     anns_field="embedding",
-        #     param=search_params,
-        #     limit=k,
-        #     expr=expr,
-        #     output_fields=["text", "metadata"]
-        # )
-
-        search_params = {"metric_type": "L2", "params": {"nprobe": 10}}
+            conditions.append(f"({metadata_filter_expr(metadata_filter)})")
         results = self.collection.search(
-            data=[query_vector],
+            data=query_vectors,
             anns_field="embedding",
-            param=search_params,
+            param=search_params(self.index_type, self.metric_type, k, ef=ef, nprobe=nprobe),
             limit=k,
+            expr=" and ".join(conditions) or None,
+            output_fields=["text", "metadata"]
         )
 
-        hits = []
-        for hit in results[0]:
-            hits.append({
+        return [
+            [{
                 "text": hit.entity.get("text"),
                 "metadata": hit.entity.get("metadata"),
                 "score": hit.score,
                 "id": hit.id
-            })
+            } for hit in hits]
+            for hits in results
+        ]
+
+    def similarity_search(
+        self,
+        query_vector: List[float],
+        k: int = 4,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for similar vectors and return top k results
+        """
+        return self.search_many([query_vector], k=k, metadata_filter=metadata_filter)[0]
+
+    def get_by_ids(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """Fetch rows by primary key, in the order of `ids`, skipping unknown ids"""
+        if not len(ids):
+            return []
+        self.load()
+        results = self.collection.query(expr=f"id in {[int(i) for i in ids]}", output_fields=["text", "metadata"])
+        rows = {row["id"]: row for row in results}
+        return [rows[i] for i in ids if i in rows]
+
+    def get_all_documents(self, batch_size: int = 1000) -> List[Dict[str, Any]]:
+        """Fetch the id and text of every row, `batch_size` rows per request"""
+        self.load()
+        iterator = self.collection.query_iterator(batch_size=batch_size, output_fields=["text"])
+        rows = []
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                return rows
+            rows.extend({"id": row["id"], "text": row["text"]} for row in batch)
+
+    def get_all_ids(self, batch_size: int = 1000) -> List[int]:
+        """Fetch the id of every row, `batch_size` rows per request"""
+        self.load()
+        iterator = self.collection.query_iterator(batch_size=batch_size, output_fields=["id"])
+        ids = []
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                return ids
+            ids.extend(row["id"] for row in batch)
+
+    def delete(self, ids: List[int]) -> int:
+        """Delete rows by primary key and return the number of deleted rows"""
+        if not len(ids):
+            return 0
+        return self.collection.delete(expr=f"id in {[int(i) for i in ids]}").delete_count
 
-        return hits
+    def count(self) -> int:
+        """Return the number of rows, including rows not flushed yet"""
+        self.load()
+        return self.collection.query(expr="", output_fields=["count(*)"])[0]["count(*)"]
 
     def delete_collection(self) -> None:
         """Delete the entire collection"""
-        if utility.has_collection(self.collection_name):
-            utility.drop_collection(self.collection_name)
+        if utility.has_collection(self.collection_name, using=self.alias):
+            utility.drop_collection(self.collection_name, using=self.alias)
+        self._loaded = False
 
-    def __del__(self):
-        """Cleanup connection when object is destroyed"""
+    def close(self):
+        """Close the connection, shared by every MilvusVectorDB using the same alias"""
         try:
-            connections.disconnect(alias="default")
-        except:
+            connections.disconnect(alias=self.alias)
+        except Exception:
             pass
 
 
 
 if __name__ == "__main__":
     #test
-    vdb = MilvusVectorDB("test_collection", dim=3)
+    vdb = MilvusVectorDB("test_collection", dim=3, uri="storage/milvus_test.db")
     vdb.add_documents(["Hello, world!", "Hello, world!", "Hello, world!"], 
                      [[1, 2, 3], [4, 5, 6], [7, 8, 9]])
     print(vdb.similarity_search([1, 2, 3]))
@@ -1,103 +1,662 @@
+import io
+import re
 import json
-from typing import List, Optional
+import struct
+import logging
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import numpy as np
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import Session
 
+logger = logging.getLogger(__name__)
+
+# Text search configuration of the generated tsvector column and of the queries
+TEXT_SEARCH_CONFIG = "english"
+
+EMBEDDING_DIM = 1536
+
+# ANN index on the embedding column, built for cosine distance (<=>)
+VECTOR_INDEX_NAME = "vector_store_embedding_idx"
+VECTOR_INDEX_METHODS = ("hnsw", "ivfflat")
+
+# Representation the ANN index is built on: "vector" (float32), "halfvec"
+# (float16, half the index size) or "bit" (binary quantized, 1 bit per
+# dimension, ranked by Hamming distance <~>). halfvec and bit need pgvector
+# 0.7+. The table keeps the float32 embedding, so halfvec/bit candidates are
+# re-ranked at full precision.
+VECTOR_STORAGE_MODES = ("vector", "halfvec", "bit")
+
+# COPY ... (FORMAT BINARY) framing
+COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_BINARY_TRAILER = struct.pack("!h", -1)
+
+# Extension, table and full text search index, all idempotent
+SCHEMA_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS vector;",
+    f"""
+    CREATE TABLE IF NOT EXISTS vector_store (
+        id SERIAL PRIMARY KEY,
+        content TEXT,
+        embedding vector({EMBEDDING_DIM}),
+        metadata JSONB
+    );
+    """,
+    # Full text search: generated tsvector column backed by a GIN index
+    f"""
+    ALTER TABLE vector_store ADD COLUMN IF NOT EXISTS content_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(content, ''))) STORED;
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS vector_store_content_tsv_idx
+    ON vector_store USING GIN (content_tsv);
+    """,
+    # Metadata filters: containment (metadata @> filter) backed by a GIN index
+    """
+    CREATE INDEX IF NOT EXISTS vector_store_metadata_idx
+    ON vector_store USING GIN (metadata jsonb_path_ops);
+    """,
+]
+
+# Metadata filtered vector search: "pre" filters then ranks exactly, "post"
+# ranks with the ANN index then filters, "auto" picks from the planner's
+# estimate of the rows matching the filter
+METADATA_FILTER_STRATEGIES = ("auto", "pre", "post")
+# Filters estimated to match at most this many rows are pre-filtered
+PREFILTER_MAX_ROWS = 20000
+METADATA_KEY_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+# pgvector's default hnsw.ef_search, which also caps the rows an HNSW scan returns
+HNSW_DEFAULT_EF_SEARCH = 40
+
+
+def _indexed_embedding(storage: str, embedding: str = "embedding") -> str:
+    """SQL expression of an embedding in the representation the ANN index is built on."""
+    if storage not in VECTOR_STORAGE_MODES:
+        raise ValueError(f"Unsupported vector storage: {storage}")
+    if storage == "halfvec":
+        return f"CAST({embedding} AS halfvec({EMBEDDING_DIM}))"
+    if storage == "bit":
+        return f"CAST(binary_quantize({embedding}) AS bit({EMBEDDING_DIM}))"
+    return embedding
+
+
+def index_distance(query_embedding: str, storage: str = "vector") -> str:
+    """Distance expression ordered by the ANN index of the given storage mode."""
+    operator = "<~>" if storage == "bit" else "<=>"
+    return f"{_indexed_embedding(storage)} {operator} {_indexed_embedding(storage, query_embedding)}"
+
+
+def vector_index_statement(method: str = "hnsw", m: int = 16, ef_construction: int = 64, lists: int = 1,
+                           storage: str = "vector") -> str:
+    """CREATE INDEX IF NOT EXISTS statement of the ANN index, see `PGVector.create_index`."""
+    if method not in VECTOR_INDEX_METHODS:
+        raise ValueError(f"Unsupported index method: {method}")
+    if method == "hnsw":
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    else:
+        options = f"lists = {int(lists)}"
+    operator_class = {"vector": "vector_cosine_ops", "halfvec": "halfvec_cosine_ops", "bit": "bit_hamming_ops"}
+    indexed = _indexed_embedding(storage)
+    if storage != "vector":
+        indexed = f"({indexed})"
+    return f"""
+        CREATE INDEX IF NOT EXISTS {VECTOR_INDEX_NAME}
+        ON vector_store USING {method} ({indexed} {operator_class[storage]})
+        WITH ({options});
+    """
+
+
+def metadata_index_statement(key: str) -> str:
+    """CREATE INDEX IF NOT EXISTS statement of a btree expression index on metadata->>key."""
+    if not METADATA_KEY_PATTERN.match(key):
+        raise ValueError(f"Invalid metadata key: {key}")
+    return f"""
+        CREATE INDEX IF NOT EXISTS vector_store_metadata_{key.lower()}_idx
+        ON vector_store ((metadata->>'{key}'));
+    """
+
+
+def metadata_filter_sql(metadata_filter: Dict, indexed_keys: Sequence[str] = ()) -> Tuple[str, dict]:
+    """WHERE condition and parameters matching rows whose metadata contains `metadata_filter`.
+    
+    The containment test uses the GIN index. String, integer and boolean
+    values of keys with an expression index are also compared as text, so
+    the planner can use the btree index for those keys instead. Floats are
+    left to the containment test, which matches 1.0 to a stored 1 while
+    their text forms differ.
+    
+    Args:
+        metadata_filter: Key/value pairs the metadata must contain, e.g. {"tenant": "acme"}
+        indexed_keys: Keys with an expression index (see `metadata_index_statement`)
+    """
+    conditions = ["metadata @> CAST(:metadata_filter AS jsonb)"]
+    params = {"metadata_filter": json.dumps(metadata_filter)}
+    for position, (key, value) in enumerate(metadata_filter.items()):
+        if key in indexed_keys and METADATA_KEY_PATTERN.match(key) and isinstance(value, (str, int, bool)):
+            conditions.append(f"metadata->>'{key}' = :metadata_value_{position}")
+            params[f"metadata_value_{position}"] = value if isinstance(value, str) else json.dumps(value)
+    return " AND ".join(conditions), params
+
+
+def vector_search_sql(query_embedding: str, where: Optional[str] = None, strategy: str = "pre",
+                      storage: str = "vector") -> str:
+    """SELECT statement of a cosine similarity search, optionally filtered.
+    
+    Without a filter, a "vector" index ranks the rows directly, while for
+    "halfvec" and "bit" the :candidates nearest rows of the index are
+    re-ranked by full precision cosine distance.
+    
+    Args:
+        query_embedding: SQL expression of the query vector
+        where: Optional filter condition (see `metadata_filter_sql`)
+        strategy: "pre" applies the filter before ranking, "post" applies it to
+            the :candidates nearest rows of the ANN index
+        storage: Representation the ANN index is built on
+    """
+    distance = f"embedding <=> {query_embedding}"
+    if (where is None and storage == "vector") or (where is not None and strategy == "pre"):
+        return f"""
+            SELECT id, content, metadata, 1 - ({distance}) AS similarity
+            FROM vector_store
+            WHERE {where or "TRUE"}
+            ORDER BY {distance}
+            LIMIT :k;
+        """
+    return f"""
+        SELECT id, content, metadata, 1 - ({distance}) AS similarity
+        FROM (
+            SELECT id, content, metadata, embedding
+            FROM vector_store
+            ORDER BY {index_distance(query_embedding, storage)}
+            LIMIT :candidates
+        ) nearest
+        WHERE {where or "TRUE"}
+        ORDER BY {distance}
+        LIMIT :k;
+    """
+
+
+def choose_filter_strategy(estimated_rows: float) -> str:
+    """Pick "pre" or "post" filtering from the estimated rows matching a filter.
+    
+    Selective filters leave few rows to rank exactly, while broad ones would
+    rank most of the table, which the ANN index followed by the filter avoids.
+    """
+    return "pre" if estimated_rows <= PREFILTER_MAX_ROWS else "post"
+
+
+def search_settings(ef_search: Optional[int] = None, probes: Optional[int] = None, limit: int = 0) -> List[Tuple[str, str]]:
+    """ANN search parameters to set for one transaction, as (setting, value) pairs.
+    
+    An HNSW scan returns at most ef_search rows, so hnsw.ef_search is raised
+    to `limit` whenever that exceeds the requested (or default) value.
+    
+    Args:
+        ef_search: HNSW candidate list size (default: pgvector's HNSW_DEFAULT_EF_SEARCH)
+        probes: Number of IVFFlat lists scanned
+        limit: Number of rows the search needs from the index
+    """
+    settings = []
+    if ef_search is not None or limit > HNSW_DEFAULT_EF_SEARCH:
+        settings.append(("hnsw.ef_search", str(int(max(ef_search or HNSW_DEFAULT_EF_SEARCH, limit)))))
+    if probes is not None:
+        settings.append(("ivfflat.probes", str(int(probes))))
+    return settings
+
+
 class PGVector:
-    def __init__(self, connection_string: str):
+    def __init__(self, connection_string: str, index_method: Optional[str] = "hnsw",
+                 metadata_index_keys: Sequence[str] = (), storage: str = "vector"):
         """Initialize PGVector with database connection string.
         
         Args:
             connection_string: PostgreSQL connection string
+            index_method: ANN index created on the embedding column if none
+                exists, "hnsw", "ivfflat" or None for no index
+            metadata_index_keys: Metadata keys commonly filtered on, each gets
+                a btree expression index
+            storage: Representation the ANN index is built on, "vector",
+                "halfvec" or "bit" (see VECTOR_STORAGE_MODES)
         """
+        if storage not in VECTOR_STORAGE_MODES:
+            raise ValueError(f"Unsupported vector storage: {storage}")
+        self.storage = storage
         self.engine = create_engine(connection_string)
+        self.metadata_index_keys = tuple(metadata_index_keys)
         self._init_db()
+        status = self.index_status()
+        if index_method is not None and status is None:
+            self.create_index(method=index_method)
+        elif status is not None and status["storage"] != storage:
+            # Searches do not match the index expression and fall back to sequential scans
+            logger.warning("Index %s is built on %s, not %s, call create_index(rebuild=True) to rebuild it",
+                           VECTOR_INDEX_NAME, status["storage"], storage)
 
     def _init_db(self):
         """Initialize the database with required extensions and tables."""
         with Session(self.engine) as session:
-            # Enable pgvector extension
-            session.execute(text("CREATE EXTENSION IF NOT EXISTS vector;"))
-            
-            # Create table for storing vectors
-            session.execute(text("""
-                CREATE TABLE IF NOT EXISTS vector_store (
-                    id SERIAL PRIMARY KEY,
-                    content TEXT,
-                    embedding vector(1536),
-                    metadata JSONB
-                );
-            """))
+            for statement in SCHEMA_STATEMENTS:
+                session.execute(text(statement))
+            for key in self.metadata_index_keys:
+                session.execute(text(metadata_index_statement(key)))
             session.commit()
 
-    def add_vectors(self, vectors: List[np.ndarray], contents: List[str], metadata: Optional[List[dict]] = None):
+    def add_vectors(self, vectors: List[np.ndarray], contents: List[str], metadata: Optional[List[dict]] = None) -> List[int]:
         """Add vectors to the database.
         
         Args:
             vectors: List of numpy arrays representing embeddings
             contents: List of content strings associated with vectors
             metadata: Optional list of metadata dictionaries
+
+        Returns:
+            List of ids assigned to the inserted rows, in input order
         """
         if metadata is None:
             metadata = [{}] * len(vectors)
             
+        ids = []
         with Session(self.engine) as session:
             for vector, content, meta in zip(vectors, contents, metadata):
                 vector_str = f"[{','.join(map(str, vector))}]"
-                session.execute(text("""
+                result = session.execute(text("""
                     INSERT INTO vector_store (content, embedding, metadata)
-                    VALUES (:content, :embedding, :metadata);
+                    VALUES (:content, :embedding, :metadata)
+                    RETURNING id;
                 """), {
                     "content": content,
                     "embedding": vector_str,
                     "metadata": json.dumps(meta)  # Convert dict to string for JSON parsing
                 })
+                ids.append(result.scalar_one())
+            session.commit()
+        return ids
+
+    def _copy_rows(self, ids: List[int], vectors: np.ndarray, contents: List[str],
+                   metadata: List[dict]) -> Iterator[bytes]:
+        """Encode rows as COPY binary tuples of (id, content, embedding, metadata).
+        
+        Embeddings use pgvector's binary format (int16 dim, int16 unused,
+        big-endian float4 values) and metadata jsonb's (version 1 + JSON text).
+        """
+        vector_header = struct.pack("!ihh", 4 + 4 * vectors.shape[1], vectors.shape[1], 0)
+        vectors = vectors.astype(">f4")
+        for doc_id, vector, content, meta in zip(ids, vectors, contents, metadata):
+            content = content.encode("utf-8")
+            meta = b"\x01" + json.dumps(meta).encode("utf-8")
+            yield b"".join((
+                struct.pack("!hii", 4, 4, doc_id),
+                struct.pack("!i", len(content)), content,
+                vector_header, vector.tobytes(),
+                struct.pack("!i", len(meta)), meta
+            ))
+
+    def bulk_add_vectors(self, vectors: List[np.ndarray], contents: List[str], metadata: Optional[List[dict]] = None,
+                         batch_size: int = 1000) -> List[int]:
+        """Add many vectors with COPY ... FROM STDIN in binary format.
+        
+        Ids are reserved from the id sequence up front, then rows are streamed
+        in COPY batches of `batch_size` rows inside a single transaction, so
+        the load is all or nothing and memory stays bounded by one batch.
+        
+        Args:
+            vectors: List of numpy arrays representing embeddings
+            contents: List of content strings associated with vectors
+            metadata: Optional list of metadata dictionaries
+            batch_size: Number of rows sent per COPY statement
+            
+        Returns:
+            List of ids assigned to the inserted rows, in input order
+        """
+        if metadata is None:
+            metadata = [{}] * len(vectors)
+        if len(vectors) == 0:
+            return []
+        copy_sql = "COPY vector_store (id, content, embedding, metadata) FROM STDIN (FORMAT BINARY)"
+
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence('vector_store', 'id')) FROM generate_series(1, %s)",
+                (len(vectors),)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            for start in range(0, len(vectors), batch_size):
+                end = start + batch_size
+                rows = self._copy_rows(
+                    ids[start:end], np.asarray(vectors[start:end], dtype=np.float32),
+                    contents[start:end], metadata[start:end]
+                )
+                if hasattr(cursor, "copy"):
+                    # psycopg 3
+                    with cursor.copy(copy_sql) as copy:
+                        copy.write(COPY_BINARY_HEADER)
+                        for row in rows:
+                            copy.write(row)
+                        copy.write(COPY_BINARY_TRAILER)
+                else:
+                    # psycopg2
+                    buffer = io.BytesIO()
+                    buffer.write(COPY_BINARY_HEADER)
+                    for row in rows:
+                        buffer.write(row)
+                    buffer.write(COPY_BINARY_TRAILER)
+                    buffer.seek(0)
+                    cursor.copy_expert(copy_sql, buffer)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        return ids
+
+    def create_index(self, method: str = "hnsw", m: int = 16, ef_construction: int = 64,
+                     lists: Optional[int] = None, rebuild: bool = False):
+        """Create the ANN index on the embedding column.
+        
+        HNSW gives better recall/latency and can be built on an empty table;
+        IVFFlat builds faster and uses less memory but its lists are computed
+        from the rows present at build time, so rebuild it after large loads.
+        
+        Args:
+            method: "hnsw" or "ivfflat"
+            m: HNSW links per node
+            ef_construction: HNSW candidate list size while building
+            lists: IVFFlat number of lists (default: rows / 1000, at least 1)
+            rebuild: Drop and recreate the index if it already exists, also
+                needed to switch an existing index to another storage mode
+        """
+        if method == "ivfflat" and lists is None:
+            lists = max(self.count() // 1000, 1)
+        statement = vector_index_statement(method, m=m, ef_construction=ef_construction, lists=lists,
+                                           storage=self.storage)
+
+        with Session(self.engine) as session:
+            if rebuild:
+                session.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME};"))
+            session.execute(text(statement))
+            session.commit()
+
+    def drop_index(self):
+        """Drop the ANN index, searches fall back to exact sequential scans."""
+        with Session(self.engine) as session:
+            session.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME};"))
             session.commit()
 
-    def search_vectors(self, query_vector: np.ndarray, k: int = 5) -> List[dict]:
+    def index_status(self) -> Optional[dict]:
+        """Describe the ANN index on the embedding column.
+        
+        Returns:
+            None if there is no index, otherwise a dictionary with the index
+            name, method, build options, whether it is valid (usable by the
+            planner), the storage mode it is built on, its size in bytes, the row count and, while a build is
+            running, its phase and tuples done/total
+        """
+        with Session(self.engine) as session:
+            row = session.execute(text("""
+                SELECT c.relname, am.amname, c.reloptions, i.indisvalid,
+                       pg_relation_size(c.oid), p.phase, p.tuples_done, p.tuples_total,
+                       pg_get_indexdef(c.oid)
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_am am ON am.oid = c.relam
+                LEFT JOIN pg_stat_progress_create_index p ON p.index_relid = c.oid
+                WHERE c.relname = :name;
+            """), {"name": VECTOR_INDEX_NAME}).first()
+            if row is None:
+                return None
+            rows = session.execute(text("SELECT count(*) FROM vector_store")).scalar_one()
+        return {
+            "name": row[0],
+            "method": row[1],
+            "options": dict(option.split("=", 1) for option in row[2] or []),
+            "valid": row[3],
+            "storage": "bit" if "bit_hamming_ops" in row[8] else "halfvec" if "halfvec_cosine_ops" in row[8] else "vector",
+            "size_bytes": row[4],
+            "rows": rows,
+            "build_phase": row[5],
+            "build_tuples_done": row[6],
+            "build_tuples_total": row[7]
+        }
+
+    def _set_search_params(self, session: Session, ef_search: Optional[int] = None, probes: Optional[int] = None,
+                           limit: int = 0):
+        """Set ANN search parameters for the current transaction only, see `search_settings`."""
+        for setting, value in search_settings(ef_search, probes, limit):
+            session.execute(text("SELECT set_config(:setting, :value, true);"), {"setting": setting, "value": value})
+
+    def _estimate_rows(self, session: Session, where: str, params: dict) -> float:
+        """Planner estimate of the rows matching a filter, without running it."""
+        plan = session.execute(text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM vector_store WHERE {where}"), params).scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]["Plan Rows"]
+
+    def search_vectors(self, query_vector: np.ndarray, k: int = 5, ef_search: Optional[int] = None,
+                       probes: Optional[int] = None, metadata_filter: Optional[Dict] = None,
+                       filter_strategy: str = "auto", candidates: Optional[int] = None) -> List[dict]:
         """Search for similar vectors using cosine similarity.
         
+        With a metadata filter, "pre" filtering ranks every matching row
+        exactly (the ANN index is not used), "post" filtering takes the
+        `candidates` nearest rows from the ANN index and filters them, which
+        can return fewer than k rows. "auto" pre-filters filters estimated to
+        match at most PREFILTER_MAX_ROWS rows, and otherwise post-filters,
+        falling back to pre-filtering when fewer than k rows survive.
+        
         Args:
             query_vector: Query vector to search for
             k: Number of results to return
+            ef_search: Optional HNSW candidate list size, higher trades latency for recall
+            probes: Optional number of IVFFlat lists scanned, higher trades latency for recall
+            metadata_filter: Optional key/value pairs the metadata must contain, e.g. {"tenant": "acme"}
+            filter_strategy: "auto", "pre" or "post"
+            candidates: Rows taken from the ANN index when post-filtering or
+                re-ranking halfvec/bit candidates (default: 10 * k)
             
         Returns:
             List of dictionaries containing search results
         """
+        if filter_strategy not in METADATA_FILTER_STRATEGIES:
+            raise ValueError(f"Unsupported filter strategy: {filter_strategy}")
         query_vector_str = f"[{','.join(map(str, query_vector))}]"
+        params = {"query_embedding": query_vector_str, "k": k, "candidates": candidates or 10 * k}
+        where = None
+        if metadata_filter:
+            where, filter_params = metadata_filter_sql(metadata_filter, self.metadata_index_keys)
+            params.update(filter_params)
+
+        with Session(self.engine) as session:
+            strategy = filter_strategy
+            if where is not None and strategy == "auto":
+                strategy = choose_filter_strategy(self._estimate_rows(session, where, params))
+            if where is not None and strategy == "post":
+                self._set_search_params(session, ef_search, probes, limit=params["candidates"])
+                rows = session.execute(text(vector_search_sql(
+                    "CAST(:query_embedding AS vector)", where, "post", self.storage
+                )), params).all()
+                if len(rows) >= k or filter_strategy == "post":
+                    return [self._search_row(row) for row in rows]
+                strategy = "pre"
+            if where is not None:
+                # Rank the filtered rows exactly instead of filtering the ANN index's nearest rows
+                session.execute(text("SELECT set_config('enable_indexscan', 'off', true);"))
+            else:
+                self._set_search_params(session, ef_search, probes, limit=k if self.storage == "vector" else params["candidates"])
+            results = session.execute(text(vector_search_sql(
+                "CAST(:query_embedding AS vector)", where, strategy, self.storage
+            )), params)
+            return [self._search_row(row) for row in results]
+
+    @staticmethod
+    def _search_row(row) -> dict:
+        return {
+            "id": row[0],
+            "content": row[1],
+            "metadata": row[2],
+            "similarity": float(row[3])
+        }
+
+    def full_text_search(self, query: str, k: int = 5) -> List[dict]:
+        """Rank rows against a free text query using the tsvector GIN index.
+        
+        Query terms are stemmed and OR-ed together, so a row matching any of
+        them is a candidate, and rows are ranked with ts_rank_cd normalized to
+        [0, 1) (rank / (rank + 1)).
         
+        Args:
+            query: Free text query
+            k: Number of results to return
+            
+        Returns:
+            List of dictionaries containing id, content, metadata and rank
+        """
         with Session(self.engine) as session:
-            results = session.execute(text("""
-                SELECT content, metadata, 
-                       1 - (embedding <=> :query_embedding) as similarity
-                FROM vector_store
-                ORDER BY embedding <=> :query_embedding
+            results = session.execute(text(f"""
+                SELECT id, content, metadata, ts_rank_cd(content_tsv, q.query, 32) AS rank
+                FROM vector_store,
+                     (SELECT replace(plainto_tsquery('{TEXT_SEARCH_CONFIG}', :query)::text, '&', '|')::tsquery AS query) q
+                WHERE content_tsv @@ q.query
+                ORDER BY rank DESC
                 LIMIT :k;
             """), {
-                "query_embedding": query_vector_str,
+                "query": query,
                 "k": k
             })
-            
             return [
                 {
-                    "content": row[0],
-                    "metadata": row[1],
-                    "similarity": float(row[2])
+                    "id": row[0],
+                    "content": row[1],
+                    "metadata": row[2],
+                    "rank": float(row[3])
                 }
                 for row in results
             ]
-    def full_text_search(self, query: str, k: int = 5) -> List[dict]:
+    
+    def hybrid_search(self, query_text: str, query_vector: np.ndarray, k: int = 5,
+                      weights: Tuple[float, float] = (0.4, 0.6), candidates: int = 50,
+                      ef_search: Optional[int] = None, probes: Optional[int] = None,
+                      metadata_filter: Optional[Dict] = None) -> List[dict]:
+        """Hybrid full text + vector search in a single SQL statement.
+        
+        The top `candidates` rows of the vector index and of the tsvector index
+        are unioned, both scores are computed for every candidate and the rows
+        are ranked by weights[0] * rank + weights[1] * similarity, where rank
+        is ts_rank_cd normalized to [0, 1) and similarity is cosine similarity.
+        
+        Args:
+            query_text: Free text query
+            query_vector: Query embedding
+            k: Number of results to return
+            weights: (full text weight, vector weight)
+            candidates: Number of candidates taken from each index
+            ef_search: Optional HNSW candidate list size, at least `candidates`
+            probes: Optional number of IVFFlat lists scanned
+            metadata_filter: Optional key/value pairs the metadata of both candidate sets must contain
+            
+        Returns:
+            List of dictionaries containing id, content, metadata, similarity, rank and score
+        """
+        query_vector_str = f"[{','.join(map(str, query_vector))}]"
+        text_weight, vector_weight = weights
+        where, filter_params = "TRUE", {}
+        if metadata_filter:
+            where, filter_params = metadata_filter_sql(metadata_filter, self.metadata_index_keys)
+
         with Session(self.engine) as session:
-            results = session.execute(text("SELECT * FROM vector_store WHERE content ILIKE :query LIMIT :k"), {
-                "query": f"%{query}%",
-                "k": k
+            self._set_search_params(session, ef_search, probes, limit=candidates)
+            results = session.execute(text(f"""
+                WITH q AS NOT MATERIALIZED (
+                    SELECT replace(plainto_tsquery('{TEXT_SEARCH_CONFIG}', :query_text)::text, '&', '|')::tsquery AS query
+                ),
+                semantic AS (
+                    SELECT id
+                    FROM vector_store
+                    WHERE {where}
+                    ORDER BY {index_distance("CAST(:query_embedding AS vector)", self.storage)}
+                    LIMIT :candidates
+                ),
+                lexical AS (
+                    SELECT id
+                    FROM vector_store, q
+                    WHERE content_tsv @@ q.query AND {where}
+                    ORDER BY ts_rank_cd(content_tsv, q.query, 32) DESC
+                    LIMIT :candidates
+                ),
+                scored AS (
+                    SELECT v.id, v.content, v.metadata,
+                           1 - (v.embedding <=> CAST(:query_embedding AS vector)) AS similarity,
+                           ts_rank_cd(v.content_tsv, q.query, 32) AS rank
+                    FROM vector_store v, q
+                    WHERE v.id IN (SELECT id FROM semantic UNION SELECT id FROM lexical)
+                )
+                SELECT id, content, metadata, similarity, rank,
+                       :text_weight * rank + :vector_weight * similarity AS score
+                FROM scored
+                ORDER BY score DESC
+                LIMIT :k;
+            """), {
+                "query_text": query_text,
+                "query_embedding": query_vector_str,
+                "text_weight": text_weight,
+                "vector_weight": vector_weight,
+                "candidates": candidates,
+                "k": k,
+                **filter_params
             })
-            return [row for row in results]
-    
+            
+            return [
+                {
+                    "id": row[0],
+                    "content": row[1],
+                    "metadata": row[2],
+                    "similarity": float(row[3]),
+                    "rank": float(row[4]),
+                    "score": float(row[5])
+                }
+                for row in results
+            ]
+
+    def get_by_ids(self, ids: List[int]) -> List[dict]:
+        """Fetch rows by primary key.
+        
+        Args:
+            ids: Ids of the rows to fetch
+            
+        Returns:
+            List of dictionaries in the order of `ids`, missing ids are skipped
+        """
+        if not ids:
+            return []
+        with Session(self.engine) as session:
+            results = session.execute(text("""
+                SELECT id, content, metadata
+                FROM vector_store
+                WHERE id = ANY(:ids);
+            """), {"ids": list(ids)})
+            rows = {row[0]: {"id": row[0], "content": row[1], "metadata": row[2]} for row in results}
+        return [rows[i] for i in ids if i in rows]
+
+    def count(self) -> int:
+        """Return the number of stored rows."""
+        with Session(self.engine) as session:
+            return session.execute(text("SELECT count(*) FROM vector_store")).scalar_one()
+
+    def get_all_documents(self) -> List[dict]:
+        """Fetch the id and content of every row, without embeddings."""
+        with Session(self.engine) as session:
+            results = session.execute(text("SELECT id, content FROM vector_store ORDER BY id"))
+            return [{"id": row[0], "content": row[1]} for row in results]
+
+    def get_all_ids(self) -> List[int]:
+        """Fetch the id of every row."""
+        with Session(self.engine) as session:
+            return list(session.execute(text("SELECT id FROM vector_store ORDER BY id")).scalars())
+
     def get_all_vectors(self) -> List[dict]:
         with Session(self.engine) as session:
-            results = session.execute(text("SELECT * FROM vector_store"))
+            results = session.execute(text("SELECT id, content, embedding, metadata FROM vector_store"))
             return [row for row in results]
 
 if __name__ == "__main__":
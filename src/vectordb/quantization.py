@@ -0,0 +1,334 @@
+import numpy as np
+from typing import List, Optional
+from vectordb.inmemory import InMemoryVectorStore
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 20, seed: int = 0,
+           max_points_per_centroid: int = 64, block_rows: int = 65536) -> np.ndarray:
+    """
+    Lloyd's k-means with centroids initialized from random rows.
+
+    Args:
+        vectors: Training vectors
+        k: Number of centroids
+        iterations: Number of assignment/update rounds
+        seed: Seed of the initialization and subsampling
+        max_points_per_centroid: Train on a random sample of at most k times this many rows
+        block_rows: Rows assigned at once, bounds the distance matrix size
+
+    Returns:
+        float32 array of shape (k, dim) with the centroids
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    if len(vectors) > k * max_points_per_centroid:
+        vectors = vectors[rng.choice(len(vectors), size=k * max_points_per_centroid, replace=False)]
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=len(vectors) < k)].copy()
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids, block_rows)
+        counts = np.bincount(assignments, minlength=k)
+        order = np.argsort(assignments, kind="stable")
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts[filled])[:-1]))
+        centroids[filled] = np.add.reduceat(vectors[order], starts, axis=0) / counts[filled, None]
+        empty = counts == 0
+        # Restart empty clusters on random rows
+        centroids[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+    """Index of the nearest centroid (L2) of every vector."""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block_rows):
+        block = vectors[start:start + block_rows]
+        # ||x - c||^2 without the constant ||x||^2 term
+        assignments[start:start + block_rows] = np.argmin(centroid_norms - 2 * block @ centroids.T, axis=1)
+    return assignments
+
+
+def _top_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    if k < len(scores):
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 scalar quantization, 1 byte per dimension.
+
+    Each dimension is mapped linearly from its trained [min, max] range to
+    [-128, 127]. Inner products are computed on the codes without decoding:
+    x . q = offset . q + codes . (scale * q).
+
+    Parameters:
+    - dim: Dimension of the vectors
+    - block_rows: Rows scored at once, bounds the float32 working set of a search
+    """
+
+    def __init__(self, dim: int, block_rows: int = 4096):
+        self.dim = dim
+        self.block_rows = block_rows
+        self.scale: Optional[np.ndarray] = None
+        self.offset: Optional[np.ndarray] = None
+        self.codes = np.zeros((0, dim), dtype=np.int8)
+        self.size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.scale is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the codes of the stored vectors."""
+        return self.size * self.dim
+
+    def train(self, vectors: np.ndarray) -> "ScalarQuantizer":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        self.scale = np.maximum(high - low, 1e-12) / 255
+        self.offset = low + 128 * self.scale
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((np.asarray(vectors, dtype=np.float32) - self.offset) / self.scale)
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.offset
+
+    def reset(self):
+        self.codes = np.zeros((0, self.dim), dtype=np.int8)
+        self.size = 0
+
+    def add(self, vectors: np.ndarray):
+        """Encode vectors and append their codes."""
+        codes = self.encode(vectors)
+        end = self.size + len(codes)
+        if end > len(self.codes):
+            grown = np.zeros((max(end, 2 * len(self.codes)), self.dim), dtype=np.int8)
+            grown[:self.size] = self.codes[:self.size]
+            self.codes = grown
+        self.codes[self.size:end] = codes
+        self.size = end
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k vectors with the largest approximate inner product."""
+        query = np.asarray(query, dtype=np.float32)
+        scaled_query = self.scale * query
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, self.block_rows):
+            block = self.codes[start:min(start + self.block_rows, self.size)]
+            scores[start:start + len(block)] = block.astype(np.float32) @ scaled_query
+        scores += float(self.offset @ query)
+        return _top_positions(scores, k)
+
+
+class IVFPQQuantizer:
+    """
+    Inverted file with product quantized residuals (IVF-PQ).
+
+    A coarse k-means assigns every vector to one of `nlist` lists, and the
+    residual to its list centroid is split into `m` sub-vectors, each stored
+    as the 1-byte index of its nearest of 256 sub-centroids. A search scans
+    the `nprobe` lists whose centroids are closest to the query and scores
+    codes by asymmetric distance computation: the inner product of the query
+    with every sub-centroid is tabulated once, so a vector scores as
+    q . centroid + sum of m table lookups.
+
+    Parameters:
+    - dim: Dimension of the vectors, divisible by m
+    - nlist: Number of coarse lists (default: 64)
+    - m: Number of sub-quantizers, i.e. code bytes per vector (default: 16)
+    - nprobe: Number of lists scanned per query (default: 8)
+    - iterations: k-means iterations used in training
+    - seed: Seed of the k-means initialization
+    """
+
+    def __init__(self, dim: int, nlist: int = 64, m: int = 16, nprobe: int = 8, iterations: int = 20, seed: int = 0):
+        if dim % m:
+            raise ValueError(f"Dimension {dim} is not divisible by m={m}")
+        self.dim = dim
+        self.nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.codes = np.zeros((0, m), dtype=np.uint8)
+        self.size = 0
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the codes and list assignments of the stored vectors."""
+        return self.size * (self.m + self.lists.itemsize)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """View vectors as (n, m, dim // m) sub-vectors."""
+        return vectors.reshape(len(vectors), self.m, self.dim // self.m)
+
+    def train(self, vectors: np.ndarray) -> "IVFPQQuantizer":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.centroids = kmeans(vectors, self.nlist, self.iterations, self.seed)
+        residuals = self._split(vectors - self.centroids[_assign(vectors, self.centroids)])
+        self.codebooks = np.stack([
+            kmeans(residuals[:, sub], 256, self.iterations, self.seed + sub) for sub in range(self.m)
+        ])
+        return self
+
+    def encode(self, vectors: np.ndarray):
+        """Return the list assignments and PQ codes of vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        lists = _assign(vectors, self.centroids)
+        residuals = self._split(vectors - self.centroids[lists])
+        codes = np.stack([_assign(residuals[:, sub], self.codebooks[sub]) for sub in range(self.m)], axis=1)
+        return lists, codes.astype(np.uint8)
+
+    def decode(self, lists: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        residuals = self.codebooks[np.arange(self.m), codes]
+        return self.centroids[lists] + residuals.reshape(len(codes), self.dim)
+
+    def reset(self):
+        self.lists = np.zeros(0, dtype=np.int32)
+        self.codes = np.zeros((0, self.m), dtype=np.uint8)
+        self.size = 0
+
+    def add(self, vectors: np.ndarray):
+        """Encode vectors and append their list assignments and codes."""
+        lists, codes = self.encode(vectors)
+        end = self.size + len(codes)
+        if end > len(self.codes):
+            capacity = max(end, 2 * len(self.codes))
+            grown_lists = np.zeros(capacity, dtype=np.int32)
+            grown_codes = np.zeros((capacity, self.m), dtype=np.uint8)
+            grown_lists[:self.size] = self.lists[:self.size]
+            grown_codes[:self.size] = self.codes[:self.size]
+            self.lists, self.codes = grown_lists, grown_codes
+        self.lists[self.size:end] = lists
+        self.codes[self.size:end] = codes
+        self.size = end
+
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        """Positions of the k vectors in the probed lists with the largest approximate inner product."""
+        query = np.asarray(query, dtype=np.float32)
+        coarse = self.centroids @ query
+        probes = _top_positions(-(self.centroids ** 2).sum(axis=1) + 2 * coarse, self.nprobe)
+        positions = np.flatnonzero(np.isin(self.lists[:self.size], probes))
+        if len(positions) == 0:
+            return positions
+        # tables[sub, code] = q_sub . codebook[sub, code]
+        tables = np.einsum("mcd,md->mc", self.codebooks, self._split(query[None])[0])
+        scores = coarse[self.lists[positions]] + tables[np.arange(self.m), self.codes[positions]].sum(axis=1)
+        return positions[_top_positions(scores, k)]
+
+
+class QuantizedVectorStore(InMemoryVectorStore):
+    """
+    InMemoryVectorStore searching compressed codes, then rescoring at full precision.
+
+    The quantizer keeps compact codes of every row in memory. A search ranks
+    the codes, takes a shortlist of `rescore * k` rows and rescores it
+    against the float32 matrix, which with a `path` is memory-mapped, so
+    only the shortlisted rows are paged in.
+
+    The quantizer is trained on the stored rows by `train` (also when a store
+    is opened with existing rows); until then searches fall back to exact
+    search. Rows added after training are encoded on insert.
+
+    Args:
+        dim: Dimension of the vectors
+        path: Optional directory holding the memory-mapped store
+        capacity: Initial number of rows allocated, doubled when full
+        quantizer: ScalarQuantizer or IVFPQQuantizer (default: ScalarQuantizer)
+        rescore: Shortlist size as a multiple of k (default: 4)
+    """
+
+    def __init__(self, dim: int = 1536, path: Optional[str] = None, capacity: int = 1024,
+                 quantizer=None, rescore: int = 4):
+        super().__init__(dim=dim, path=path, capacity=capacity)
+        self.quantizer = quantizer if quantizer is not None else ScalarQuantizer(dim)
+        self.rescore = rescore
+        if self.ids:
+            self.train()
+
+    def train(self, sample: Optional[np.ndarray] = None):
+        """Train the quantizer on `sample` (default: all stored rows) and re-encode every row.
+
+        Args:
+            sample: Optional training vectors
+        """
+        with self._lock:
+            vectors = self._vectors[:len(self.ids)]
+            self.quantizer.train(vectors if sample is None else self._normalize(np.asarray(sample, dtype=np.float32)))
+            self.quantizer.reset()
+            self.quantizer.add(vectors)
+
+    def add_vectors(self, vectors: List[np.ndarray], contents: List[str], metadata: Optional[List[dict]] = None) -> List[int]:
+        """Add vectors to the store and encode them if the quantizer is trained.
+
+        Args:
+            vectors: List of numpy arrays representing embeddings
+            contents: List of content strings associated with vectors
+            metadata: Optional list of metadata dictionaries
+
+        Returns:
+            List of ids assigned to the inserted rows, in input order
+        """
+        if metadata is None:
+            metadata = [{}] * len(vectors)
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        with self._lock:
+            start, ids = self._append_rows(vectors, contents, metadata)
+            if self.quantizer.is_trained:
+                self.quantizer.add(self._vectors[start:start + len(ids)])
+        return ids
+
+    def delete(self, ids: List[int]) -> int:
+        """Delete rows by id and re-encode the remaining rows.
+
+        Args:
+            ids: Ids of the rows to delete
+
+        Returns:
+            Number of deleted rows
+        """
+        with self._lock:
+            deleted = self._compact(ids)
+            if deleted and self.quantizer.is_trained:
+                self.quantizer.reset()
+                self.quantizer.add(self._vectors[:len(self.ids)])
+        return deleted
+
+    def search_batch(self, query_vectors: List[np.ndarray], k: int = 5, **kwargs) -> List[List[dict]]:
+        """Search the codes and rescore the shortlist of each query at full precision.
+
+        Filtered searches (`metadata_filter`) rank the matching rows exactly.
+
+        Args:
+            query_vectors: Query vectors to search for
+            k: Number of results to return per query
+
+        Returns:
+            One list of result dictionaries per query, most similar first
+        """
+        if not self.quantizer.is_trained or kwargs.get("metadata_filter"):
+            return super().search_batch(query_vectors, k=k, **kwargs)
+        queries = self._normalize(np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.dim))
+        rows = self._snapshot()
+        results = []
+        for query in queries:
+            shortlist = np.sort(self.quantizer.search(query, self.rescore * k))
+            shortlist = shortlist[shortlist < len(rows[0])]
+            similarities = rows[0][shortlist] @ query
+            top = _top_positions(similarities, k)
+            results.append([self._row(rows, int(shortlist[i]), float(similarities[i])) for i in top])
+        return results
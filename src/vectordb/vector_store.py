@@ -0,0 +1,190 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Protocol, runtime_checkable
+import numpy as np
+
+VECTOR_BACKENDS = ("pgvector", "milvus", "memory")
+
+
+@runtime_checkable
+class VectorStore(Protocol):
+    """
+    Async interface shared by the vector store backends.
+
+    Implemented by AsyncPGVector, AsyncMilvusVectorStore and
+    AsyncInMemoryVectorStore, so the upload and chat paths do not depend on
+    the backend. Search results are dictionaries with "id", "content",
+    "metadata" and "similarity" (higher is more similar); metadata filters
+    are key/value pairs the metadata must contain.
+    """
+
+    async def init(self) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+    async def add(self, vectors: List[np.ndarray], contents: List[str],
+                  metadata: Optional[List[dict]] = None) -> List[int]:
+        ...
+
+    async def search(self, query_vector: np.ndarray, k: int = 5,
+                     metadata_filter: Optional[Dict] = None) -> List[dict]:
+        ...
+
+    async def search_many(self, query_vectors: List[np.ndarray], k: int = 5,
+                          metadata_filter: Optional[Dict] = None) -> List[List[dict]]:
+        ...
+
+    async def delete(self, ids: List[int]) -> int:
+        ...
+
+    async def count(self) -> int:
+        ...
+
+    async def get_by_ids(self, ids: List[int]) -> List[dict]:
+        ...
+
+    async def get_all_ids(self) -> List[int]:
+        ...
+
+    async def get_all_documents(self) -> List[dict]:
+        ...
+
+
+class AsyncMilvusVectorStore:
+    """
+    VectorStore over a MilvusVectorDB, whose blocking calls run in worker threads.
+
+    Hits are returned with "content" instead of "text"; with the L2 metric the
+    negated distance is reported as similarity so that higher stays better.
+
+    Args:
+        vdb: Milvus collection to serve
+    """
+
+    def __init__(self, vdb):
+        self.vdb = vdb
+
+    async def init(self) -> None:
+        await asyncio.to_thread(self.vdb.load)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(self.vdb.close)
+
+    def _result(self, hit: Dict[str, Any]) -> dict:
+        similarity = -hit["score"] if self.vdb.metric_type == "L2" else hit["score"]
+        return {"id": hit["id"], "content": hit["text"], "metadata": hit["metadata"], "similarity": similarity}
+
+    async def add(self, vectors: List[np.ndarray], contents: List[str],
+                  metadata: Optional[List[dict]] = None) -> List[int]:
+        return await asyncio.to_thread(self.vdb.add_documents, contents, vectors, metadata)
+
+    async def search(self, query_vector: np.ndarray, k: int = 5,
+                     metadata_filter: Optional[Dict] = None) -> List[dict]:
+        return (await self.search_many([query_vector], k=k, metadata_filter=metadata_filter))[0]
+
+    async def search_many(self, query_vectors: List[np.ndarray], k: int = 5,
+                          metadata_filter: Optional[Dict] = None) -> List[List[dict]]:
+        results = await asyncio.to_thread(self.vdb.search_many, query_vectors, k=k, metadata_filter=metadata_filter)
+        return [[self._result(hit) for hit in hits] for hits in results]
+
+    async def delete(self, ids: List[int]) -> int:
+        return await asyncio.to_thread(self.vdb.delete, ids)
+
+    async def count(self) -> int:
+        return await asyncio.to_thread(self.vdb.count)
+
+    async def get_by_ids(self, ids: List[int]) -> List[dict]:
+        rows = await asyncio.to_thread(self.vdb.get_by_ids, ids)
+        return [{"id": row["id"], "content": row["text"], "metadata": row["metadata"]} for row in rows]
+
+    async def get_all_ids(self) -> List[int]:
+        return await asyncio.to_thread(self.vdb.get_all_ids)
+
+    async def get_all_documents(self) -> List[dict]:
+        rows = await asyncio.to_thread(self.vdb.get_all_documents)
+        return [{"id": row["id"], "content": row["text"]} for row in rows]
+
+
+class AsyncInMemoryVectorStore:
+    """
+    VectorStore over an in-process InMemoryVectorStore.
+
+    Searches and writes run in worker threads, the matrix products release
+    the GIL so concurrent searches overlap. `close` calls the store's `close`
+    if it has one, e.g. to save an HNSW graph.
+
+    Args:
+        store: In-memory store to serve
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    async def init(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        close = getattr(self.store, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+
+    async def add(self, vectors: List[np.ndarray], contents: List[str],
+                  metadata: Optional[List[dict]] = None) -> List[int]:
+        return await asyncio.to_thread(self.store.add_vectors, vectors, contents, metadata)
+
+    async def search(self, query_vector: np.ndarray, k: int = 5,
+                     metadata_filter: Optional[Dict] = None) -> List[dict]:
+        return (await self.search_many([query_vector], k=k, metadata_filter=metadata_filter))[0]
+
+    async def search_many(self, query_vectors: List[np.ndarray], k: int = 5,
+                          metadata_filter: Optional[Dict] = None) -> List[List[dict]]:
+        return await asyncio.to_thread(self.store.search_batch, query_vectors, k=k, metadata_filter=metadata_filter)
+
+    async def delete(self, ids: List[int]) -> int:
+        return await asyncio.to_thread(self.store.delete, ids)
+
+    async def count(self) -> int:
+        return self.store.count()
+
+    async def get_by_ids(self, ids: List[int]) -> List[dict]:
+        return self.store.get_by_ids(ids)
+
+    async def get_all_ids(self) -> List[int]:
+        return self.store.get_all_ids()
+
+    async def get_all_documents(self) -> List[dict]:
+        return self.store.get_all_documents()
+
+
+def create_vector_store(backend: str, dim: int = 1536) -> VectorStore:
+    """
+    Create the VectorStore of a backend, configured from configs.
+
+    Args:
+        backend: "pgvector" (DATABASE_URL), "milvus" (MILVUS_URI, MILVUS_COLLECTION)
+            or "memory" (INMEMORY_STORE_PATH)
+        dim: Dimension of the vectors
+
+    Returns:
+        The store, call `init` before use and `close` at shutdown
+    """
+    from configs import (
+        DATABASE_URL, DB_MAX_OVERFLOW, DB_POOL_SIZE, DB_POOL_TIMEOUT, INMEMORY_STORE_PATH, METADATA_INDEX_KEYS,
+        MILVUS_COLLECTION, MILVUS_URI, VECTOR_STORAGE
+    )
+    if backend == "pgvector":
+        from vectordb.async_pgvector import AsyncPGVector
+        return AsyncPGVector(
+            DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT,
+            metadata_index_keys=METADATA_INDEX_KEYS, storage=VECTOR_STORAGE
+        )
+    if backend == "milvus":
+        from vectordb.milvus_vectordb import MilvusVectorDB
+        return AsyncMilvusVectorStore(
+            MilvusVectorDB(MILVUS_COLLECTION, dim=dim, uri=MILVUS_URI, index_type="HNSW", metric_type="COSINE")
+        )
+    if backend == "memory":
+        from vectordb.inmemory import InMemoryVectorStore
+        return AsyncInMemoryVectorStore(InMemoryVectorStore(dim=dim, path=INMEMORY_STORE_PATH or None))
+    raise ValueError(f"Unsupported vector backend: {backend}")
@@ -0,0 +1,151 @@
+import pytest
+import numpy as np
+from search.bm25 import BM25, SparseBM25
+from search.bm25_index import BM25Index, tokenize
+
+CORPUS = [
+    "retrieval augmented generation combines search and generation",
+    "bm25 is a bag of words ranking function",
+    "vector search uses embeddings for semantic similarity",
+    "hybrid search mixes bm25 and vector search",
+    "the quick brown fox jumps over the lazy dog",
+]
+
+
+def test_index_matches_bm25_scores():
+    documents = [tokenize(doc) for doc in CORPUS]
+    bm25 = BM25()
+    bm25.fit(documents)
+    index = BM25Index()
+    index.add_documents(range(100, 100 + len(documents)), documents)
+
+    query = tokenize("hybrid vector search bm25")
+    scores = index.get_scores(query)
+    for idx, doc in enumerate(documents):
+        expected = bm25.score(query, doc, idx)
+        assert scores.get(100 + idx, 0.0) == pytest.approx(expected)
+
+
+def test_incremental_updates_match_refit():
+    documents = [tokenize(doc) for doc in CORPUS]
+    index = BM25Index()
+    index.add_documents([0, 1], documents[:2])
+    index.add_documents([2, 3, 4], documents[2:])
+    index.remove_documents([1])
+
+    refit = BM25Index()
+    refit.add_documents([0, 2, 3, 4], [documents[0]] + documents[2:])
+
+    query = tokenize("bm25 search generation")
+    assert len(index) == 4
+    assert 1 not in index
+    results, expected = index.search(query), refit.search(query)
+    assert [doc_id for doc_id, _ in results] == [doc_id for doc_id, _ in expected]
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected])
+
+
+def test_search_returns_top_k_sorted():
+    index = BM25Index()
+    index.add_documents(range(len(CORPUS)), [tokenize(doc) for doc in CORPUS])
+
+    results = index.search(tokenize("search"), top_k=2)
+    assert len(results) == 2
+    assert results[0][1] >= results[1][1]
+    assert {doc_id for doc_id, _ in results} <= {0, 2, 3}
+    assert index.search(tokenize("unknown terms")) == []
+
+
+def test_sparse_bm25_matches_bm25():
+    documents = [tokenize(doc) for doc in CORPUS]
+    bm25 = BM25()
+    bm25.fit(documents)
+    sparse = SparseBM25().fit(documents)
+
+    query = tokenize("bm25 bm25 fox hybrid")
+    expected = [bm25.score(query, doc, idx) for idx, doc in enumerate(documents)]
+    assert sparse.get_scores(query) == pytest.approx(expected, rel=1e-5)
+    results, expected = sparse.rerank(query, documents, top_k=3), bm25.rerank(query, documents, top_k=3)
+    assert [idx for idx, _ in results] == [idx for idx, _ in expected]
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected], rel=1e-5)
+
+
+def test_sparse_bm25_top_k():
+    rng = np.random.default_rng(0)
+    documents = [list(rng.choice(list("abcdefghij"), size=rng.integers(1, 20))) for _ in range(200)]
+    sparse = SparseBM25().fit(documents, doc_ids=range(1000, 1200))
+
+    query = ["a", "c", "j"]
+    scores = sparse.get_scores(query)
+    results = sparse.top_k(query, k=5)
+    assert [score for _, score in results] == pytest.approx(sorted(scores, reverse=True)[:5])
+    assert all(scores[doc_id - 1000] == score for doc_id, score in results)
+    assert sparse.top_k(["unknown"]) == []
+
+
+def test_index_search_uses_compiled_scores():
+    documents = [tokenize(doc) for doc in CORPUS]
+    index = BM25Index()
+    index.add_documents(range(len(documents)), documents)
+    query = tokenize("vector search")
+
+    expected = sorted(index.get_scores(query).items(), key=lambda x: x[1], reverse=True)
+    results = index.search(query, top_k=None)
+    assert [doc_id for doc_id, _ in results] == [doc_id for doc_id, _ in expected]
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected], rel=1e-5)
+
+
+def test_maxscore_matches_exhaustive_top_k():
+    rng = np.random.default_rng(1)
+    vocab_size = 500
+    probs = 1.0 / np.arange(1, vocab_size + 1)
+    documents = [
+        [f"t{term}" for term in rng.choice(vocab_size, size=rng.integers(5, 60), p=probs / probs.sum())]
+        for _ in range(1000)
+    ]
+    sparse = SparseBM25().fit(documents)
+
+    for _ in range(20):
+        query = [f"t{term}" for term in rng.choice(vocab_size, size=4, p=probs / probs.sum())]
+        stats = {}
+        pruned = sparse.top_k(query, k=10, pruning=True, stats=stats)
+        exhaustive = sparse.top_k(query, k=10)
+        assert [score for _, score in pruned] == pytest.approx([score for _, score in exhaustive])
+        assert stats["postings_scored"] <= stats["postings_total"]
+
+
+def test_snapshot_roundtrip(tmp_path):
+    documents = [tokenize(doc) for doc in CORPUS] + [["naïve", "café", "search"]]
+    sparse = SparseBM25().fit(documents, doc_ids=range(10, 10 + len(documents)))
+    path = str(tmp_path / "bm25.idx")
+    sparse.save(path)
+
+    loaded = SparseBM25.load(path)
+    assert isinstance(loaded.doc_indices, np.memmap) or isinstance(loaded.doc_indices.base, np.memmap)
+    assert len(loaded.vocab) == len(sparse.vocab)
+    assert all(loaded.vocab[term] == term_id for term, term_id in sparse.vocab.items())
+    assert "missing" not in loaded.vocab
+    for query in (["search", "café"], ["bm25", "vector", "search"], ["missing"]):
+        assert loaded.top_k(query, k=3) == sparse.top_k(query, k=3)
+        assert loaded.top_k(query, k=3, pruning=True) == sparse.top_k(query, k=3, pruning=True)
+
+
+def test_index_snapshot_shared_between_workers(tmp_path):
+    path = str(tmp_path / "bm25.idx")
+    documents = [tokenize(doc) for doc in CORPUS]
+    writer = BM25Index(snapshot_path=path)
+    writer.add_documents([0, 1, 2], documents[:3])
+
+    reader = BM25Index(snapshot_path=path)
+    assert len(reader) == 3
+    assert reader.search(tokenize("vector search")) == writer.search(tokenize("vector search"))
+
+    # Updates from either side are merged through the snapshot
+    writer.add_documents([3], documents[3:4])
+    reader.add_documents([4], documents[4:])
+    assert writer.refresh()
+    assert len(writer) == len(reader) == 5
+
+    expected = BM25Index()
+    expected.add_documents(range(5), documents)
+    query = tokenize("hybrid search fox")
+    assert [doc_id for doc_id, _ in writer.search(query)] == [doc_id for doc_id, _ in expected.search(query)]
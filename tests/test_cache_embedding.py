@@ -0,0 +1,130 @@
+import json
+import time
+import numpy as np
+import pytest
+
+from cache_embedding import EMBEDDING_HEADER, EmbeddingCache, TieredEmbeddingCache, decode_embedding, encode_embedding
+
+
+def test_float32_round_trip():
+    vector = np.random.default_rng(0).normal(size=1536).astype(np.float32)
+    data = encode_embedding(vector.tolist())
+    assert len(data) == EMBEDDING_HEADER.size + 4 * 1536
+    decoded = decode_embedding(data)
+    assert decoded.dtype == np.float32
+    assert np.array_equal(decoded, vector)
+
+
+def test_float16_halves_size():
+    vector = np.random.default_rng(1).normal(size=1536)
+    data = encode_embedding(vector, dtype="float16")
+    assert len(data) == EMBEDDING_HEADER.size + 2 * 1536
+    assert decode_embedding(data) == pytest.approx(vector, rel=1e-3, abs=1e-3)
+
+
+def test_legacy_json_entries_are_readable():
+    vector = [0.1, -0.2, 0.3]
+    assert decode_embedding(json.dumps(vector).encode()) == pytest.approx(vector)
+
+
+def test_unknown_version_is_rejected():
+    data = bytearray(encode_embedding([1.0, 2.0]))
+    data[3] = 99
+    with pytest.raises(ValueError):
+        decode_embedding(bytes(data))
+
+
+def test_embedding_cache_batches_against_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    cache = EmbeddingCache(dtype="float16")
+    cache.redis_client = fakeredis.FakeRedis()
+    pipelines, mgets = [], []
+    pipeline, mget = cache.redis_client.pipeline, cache.redis_client.mget
+    monkeypatch.setattr(cache.redis_client, "pipeline", lambda **kwargs: pipelines.append(kwargs) or pipeline(**kwargs))
+    monkeypatch.setattr(cache.redis_client, "mget", lambda keys: mgets.append(list(keys)) or mget(keys))
+
+    vectors = np.random.default_rng(2).normal(size=(2, 8))
+    assert cache.set_many(["a", "b"], vectors, ttl=60)
+    assert cache.set_many(["forever"], vectors[:1])
+    assert pipelines == [{"transaction": False}] * 2
+    assert 0 < cache.redis_client.ttl("a") <= 60 and cache.redis_client.ttl("forever") == -1
+    assert cache.redis_client.get("a") == encode_embedding(vectors[0], dtype="float16")
+
+    cache.redis_client.set("legacy", json.dumps([0.5, -0.5]))
+    cache.redis_client.set("garbage", b"EMB\x63 not an embedding")
+    a, missing, legacy, garbage = cache.get_many(["a", "missing", "legacy", "garbage"])
+    assert mgets == [["a", "missing", "legacy", "garbage"]]
+    assert a.dtype == np.float32 and a == pytest.approx(vectors[0], rel=1e-3, abs=1e-3)
+    assert missing is None and garbage is None
+    assert legacy.tolist() == [0.5, -0.5]
+    assert cache.get_many([]) == [] and cache.set_many([], [])
+
+
+class RecordingCache:
+    """Stands in for the Redis tier and records every call."""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def get_embedding(self, key):
+        self.calls.append(("get", key))
+        return self.data.get(key)
+
+    def store_embedding(self, key, embedding, ttl=None):
+        self.calls.append(("set", key))
+        self.data[key] = np.asarray(embedding, dtype=np.float32)
+        return True
+
+    def get_many(self, keys):
+        self.calls.append(("mget", tuple(keys)))
+        return [self.data.get(key) for key in keys]
+
+    def set_many(self, keys, embeddings, ttl=None):
+        self.calls.append(("mset", tuple(keys)))
+        self.data.update(zip(keys, (np.asarray(embedding, dtype=np.float32) for embedding in embeddings)))
+        return True
+
+    def delete_embedding(self, key):
+        return self.data.pop(key, None) is not None
+
+
+def test_tiered_cache_reads_through_and_serves_hot_keys_locally():
+    redis_tier = RecordingCache()
+    redis_tier.data["warm"] = np.ones(4, dtype=np.float32)
+    cache = TieredEmbeddingCache(redis_tier)
+
+    assert cache.get_embedding("cold") is None
+    assert cache.get_embedding("warm").tolist() == [1.0] * 4
+    redis_tier.calls.clear()
+    assert cache.get_embedding("warm").tolist() == [1.0] * 4
+    cache.store_embedding("new", [2.0] * 4, ttl=60)
+    assert cache.get_embedding("new").tolist() == [2.0] * 4
+    assert redis_tier.calls == [("set", "new")]
+
+    assert [None if e is None else e[0] for e in cache.get_many(["warm", "cold", "new"])] == [1.0, None, 2.0]
+    assert redis_tier.calls[-1] == ("mget", ("cold",))
+    with pytest.raises(ValueError):
+        cache.get_embedding("warm")[0] = 5.0
+
+    metrics = cache.metrics()
+    assert (metrics["local_hits"], metrics["local_misses"], metrics["redis_hits"], metrics["redis_misses"]) == (5, 3, 1, 2)
+    assert metrics["local_entries"] == 2
+
+
+def test_tiered_cache_is_bounded_by_bytes_and_ttl():
+    entry_bytes = 4 * 100 + TieredEmbeddingCache.ENTRY_OVERHEAD_BYTES
+    cache = TieredEmbeddingCache(RecordingCache(), max_bytes=3 * entry_bytes, ttl=0.1)
+    for i in range(5):
+        cache.store_embedding(str(i), np.full(100, i))
+    cache.get_embedding("2")
+    cache.store_embedding("5", np.full(100, 5))
+    assert sorted(cache.local) == ["2", "4", "5"]
+    assert cache.metrics()["local_bytes"] == 3 * entry_bytes
+
+    # Entries expire with the shorter of the local TTL and their Redis TTL
+    cache.store_embedding("short", np.zeros(100), ttl=0.02)
+    time.sleep(0.05)
+    assert "short" not in cache.local and "5" in cache.local
+    time.sleep(0.1)
+    assert len(cache.local) == 0
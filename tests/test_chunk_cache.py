@@ -0,0 +1,63 @@
+import asyncio
+
+from embedding.chunk_cache import ChunkEmbeddingCache, chunk_cache_key
+from embedding.scheduler import EmbeddingScheduler
+from context_packer import Tokenizer
+
+
+class DictCache:
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set_many(self, keys, embeddings, ttl=None):
+        self.data.update(zip(keys, embeddings))
+        return True
+
+
+class CountingGenerator:
+    provider, model, dimensions = "fake", "fake-embedding", 2
+    max_batch_inputs, max_batch_tokens = 100, 10000
+    tokenizer = Tokenizer("fake-embedding")
+
+    def __init__(self):
+        self.embedded = []
+
+    def get_batch_embeddings(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    embed_batch = get_batch_embeddings
+
+
+def test_chunk_cache_key_normalizes_text():
+    key = chunk_cache_key("Hello   world\n", "openai", "text-embedding-3-small", 1536)
+    assert key == chunk_cache_key(" Hello world", "openai", "text-embedding-3-small", 1536)
+    assert key != chunk_cache_key("Hello world", "openai", "text-embedding-3-small", 512)
+    assert key != chunk_cache_key("Hello world", "gemini", "text-embedding-3-small", 1536)
+
+
+def test_only_misses_are_embedded():
+    generator = CountingGenerator()
+    cache = ChunkEmbeddingCache(DictCache(), generator)
+    assert cache.embed(["a", "bb", "a"]) == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert generator.embedded == ["a", "bb"]
+
+    # Re-upload of an edited document: only the changed chunk is sent
+    assert cache.embed(["a", "ccc", "bb "]) == [[1.0, 1.0], [3.0, 1.0], [2.0, 1.0]]
+    assert generator.embedded == ["a", "bb", "ccc"]
+    assert cache.metrics() == {
+        "chunks": 6, "hits": 2, "misses": 3, "duplicates": 1, "hit_rate": 2 / 6, "provider_calls_saved": 3
+    }
+
+
+def test_embed_async_uses_scheduler():
+    generator = CountingGenerator()
+    cache = ChunkEmbeddingCache(DictCache(), generator)
+    cache.embed(["a"])
+    scheduler = EmbeddingScheduler(generator)
+    assert asyncio.run(cache.embed_async(["bb", "a", "bb"], scheduler)) == [[2.0, 1.0], [1.0, 1.0], [2.0, 1.0]]
+    assert generator.embedded == ["a", "bb"]
+    assert scheduler.stats["texts"] == 1
@@ -0,0 +1,47 @@
+from context_packer import ContextPacker, Tokenizer
+from splitter.text_splitter import RecursiveCharacterTextSplitter
+
+TEXT = " ".join(f"sentence number {i} about retrieval augmented generation." for i in range(200))
+
+
+def test_overlapping_chunks_are_trimmed():
+    chunks = RecursiveCharacterTextSplitter(chunk_size=300, chunk_overlap=100).split_text(TEXT)
+    packer = ContextPacker(token_budget=10_000)
+
+    packed = packer.pack([chunks[3], chunks[4], chunks[2], chunks[3]])
+
+    assert packed.dropped_documents == 1
+    # The packed pieces cover chunks 2-4 without repeating the overlaps
+    assert packed.documents[0] == chunks[3]
+    assert packed.documents[0] + " " + packed.documents[1] in TEXT
+    assert packed.documents[2] + " " + packed.documents[0] in TEXT
+    assert packed.dropped_tokens > 0
+
+
+def test_budget_is_respected():
+    documents = [f"document {i} " + "word " * 200 for i in range(10)]
+    packer = ContextPacker(token_budget=700, max_chunk_tokens=300, min_chunk_tokens=50)
+    # Expectations below assume the 4 characters per token estimate
+    packer.tokenizer.encoding = None
+
+    packed = packer.pack(documents)
+
+    assert packed.included_tokens <= 700
+    assert [doc.split()[1] for doc in packed.documents] == ["0", "1", "2"]
+    assert packed.truncated_documents == 1
+    assert packed.dropped_documents == 7
+    total = sum(packer.tokenizer.count(doc) for doc in documents)
+    assert packed.included_tokens + packed.dropped_tokens == total
+
+
+def test_empty_documents():
+    packed = ContextPacker().pack([])
+    assert packed.documents == []
+    assert packed.included_tokens == packed.dropped_tokens == 0
+
+
+def test_tokenizer_counts_special_token_text():
+    tokenizer = Tokenizer("text-embedding-3-small")
+    text = "uploaded chunk ending in <|endoftext|>"
+    assert tokenizer.count(text) > 0
+    assert tokenizer.truncate(text, tokenizer.count(text)) == text
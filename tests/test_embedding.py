@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+import httpx
+import openai
+import pytest
+
+from embedding.third_party import EmbeddingGenerator, pack_batches
+
+
+class FakeEmbeddings:
+    """OpenAI embeddings endpoint that rejects requests over `max_inputs` and returns data out of order."""
+
+    def __init__(self, max_inputs, error="too many tokens"):
+        self.max_inputs = max_inputs
+        self.error = error
+        self.calls = []
+
+    def create(self, model, input, dimensions):
+        self.calls.append(len(input))
+        if len(input) > self.max_inputs:
+            response = httpx.Response(400, request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+            raise openai.BadRequestError(self.error, response=response, body=None)
+        data = [SimpleNamespace(index=i, embedding=[float(text.split()[-1])]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=data[::-1])
+
+
+def make_generator(max_inputs=1000, max_batch_inputs=2048, max_batch_tokens=300000, error="too many tokens"):
+    generator = EmbeddingGenerator(provider="openai", api_key="test")
+    generator.client = SimpleNamespace(embeddings=FakeEmbeddings(max_inputs, error))
+    generator.max_batch_inputs, generator.max_batch_tokens = max_batch_inputs, max_batch_tokens
+    return generator
+
+
+def test_pack_batches():
+    assert pack_batches([1] * 5, max_inputs=2, max_tokens=100) == [(0, 2), (2, 4), (4, 5)]
+    assert pack_batches([40, 40, 40, 150, 10], max_inputs=10, max_tokens=100) == [(0, 2), (2, 3), (3, 4), (4, 5)]
+    assert pack_batches([], max_inputs=10, max_tokens=100) == []
+
+
+def test_batch_embeddings_in_order():
+    generator = make_generator(max_batch_inputs=4)
+    texts = [f"chunk {i}" for i in range(10)]
+    assert generator.get_batch_embeddings(texts) == [[float(i)] for i in range(10)]
+    assert generator.client.embeddings.calls == [4, 4, 2]
+
+
+def test_rejected_batch_is_split():
+    generator = make_generator(max_inputs=3)
+    texts = [f"chunk {i}" for i in range(10)]
+    assert generator.get_batch_embeddings(texts) == [[float(i)] for i in range(10)]
+    assert generator.client.embeddings.calls == [10, 5, 2, 3, 5, 2, 3]
+
+    generator = make_generator(max_inputs=0)
+    with pytest.raises(openai.BadRequestError):
+        generator.get_batch_embeddings(["chunk 1"])
+
+
+def test_other_bad_requests_are_not_split():
+    generator = make_generator(max_inputs=0, error="This model does not support specifying dimensions.")
+    with pytest.raises(openai.BadRequestError):
+        generator.get_batch_embeddings([f"chunk {i}" for i in range(10)])
+    assert generator.client.embeddings.calls == [10]
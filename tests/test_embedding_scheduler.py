@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+import pytest
+
+from context_packer import Tokenizer
+from embedding.scheduler import EmbeddingScheduler, TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class FakeProvider:
+    """Embedding provider with a fixed latency that answers the first `failures` requests with 429."""
+
+    def __init__(self, latency=0.02, failures=0, max_batch_inputs=4):
+        self.latency = latency
+        self.failures = failures
+        self.max_batch_inputs = max_batch_inputs
+        self.max_batch_tokens = 10000
+        self.tokenizer = Tokenizer("text-embedding-3-small")
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_batch(self, texts):
+        with self._lock:
+            self.requests += 1
+            failed = self.requests <= self.failures
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        if failed:
+            raise RateLimited("429 Too Many Requests")
+        return [[float(text.split()[-1])] for text in texts]
+
+
+def test_scheduler_embeds_concurrently_in_order():
+    provider = FakeProvider()
+    scheduler = EmbeddingScheduler(provider, max_concurrency=3)
+    texts = [f"chunk {i}" for i in range(40)]
+    progress = []
+
+    embeddings = asyncio.run(scheduler.embed(texts, progress=lambda done, total: progress.append((done, total))))
+
+    assert embeddings == [[float(i)] for i in range(40)]
+    assert provider.requests == 10
+    assert 1 < provider.max_in_flight <= 3
+    assert progress[-1] == (40, 40) and len(progress) == 10
+    assert scheduler.stats["texts"] == 40 and scheduler.stats["rate_limited"] == 0
+
+
+def test_scheduler_retries_rate_limited_requests():
+    provider = FakeProvider(failures=3)
+    scheduler = EmbeddingScheduler(provider, max_concurrency=2, base_delay=0.01)
+    texts = [f"chunk {i}" for i in range(8)]
+
+    assert asyncio.run(scheduler.embed(texts)) == [[float(i)] for i in range(8)]
+    assert scheduler.stats["rate_limited"] == 3
+    assert provider.requests == 5
+
+    provider = FakeProvider(failures=100)
+    scheduler = EmbeddingScheduler(provider, max_retries=2, base_delay=0.01)
+    with pytest.raises(RateLimited):
+        asyncio.run(scheduler.embed(texts[:1]))
+    assert provider.requests == 3
+
+
+def test_token_bucket_limits_rate():
+    async def run():
+        bucket = TokenBucket(rate_per_minute=6000)
+        # Larger than the bucket: takes the full bucket instead of waiting forever
+        await bucket.acquire(10 ** 6)
+        start = time.monotonic()
+        await bucket.acquire(20)
+        return time.monotonic() - start
+
+    # 20 tokens at 100 tokens/s
+    assert 0.18 <= asyncio.run(run()) < 0.5
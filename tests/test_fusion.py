@@ -0,0 +1,38 @@
+import pytest
+from search.fusion import weighted_score_fusion, reciprocal_rank_fusion
+
+BM25_RESULTS = [
+    {"id": 1, "score": 9.0},
+    {"id": 2, "score": 5.0},
+    {"id": 3, "score": 1.0},
+]
+VECTOR_RESULTS = [
+    {"id": 3, "score": 0.9, "content": "three"},
+    {"id": 4, "score": 0.8, "content": "four"},
+    {"id": 1, "score": 0.5, "content": "one"},
+]
+
+
+def test_weighted_fusion_joins_by_id():
+    fused = weighted_score_fusion([BM25_RESULTS, VECTOR_RESULTS], weights=(0.4, 0.6))
+
+    scores = {doc["id"]: doc["score"] for doc in fused}
+    assert scores == pytest.approx({1: 0.4, 2: 0.2, 3: 0.6, 4: 0.45})
+    assert [doc["id"] for doc in fused] == [3, 4, 1, 2]
+    # Fields of every list are merged into the fused candidate
+    assert fused[2]["content"] == "one"
+    assert "content" not in fused[3]
+
+
+def test_rrf_returns_exactly_k():
+    fused = reciprocal_rank_fusion([BM25_RESULTS, VECTOR_RESULTS], k=2)
+
+    assert len(fused) == 2
+    assert [doc["id"] for doc in fused] == [1, 3]
+    assert fused[0]["score"] == pytest.approx(1 / 61 + 1 / 63)
+
+
+def test_fusion_with_empty_lists():
+    assert weighted_score_fusion([[], []], weights=(0.5, 0.5), k=3) == []
+    fused = weighted_score_fusion([[], VECTOR_RESULTS], weights=(0.4, 0.6), k=5)
+    assert [doc["id"] for doc in fused] == [3, 4, 1]
@@ -0,0 +1,91 @@
+import asyncio
+import numpy as np
+import pytest
+
+from vectordb.milvus_vectordb import MilvusVectorDB, ROW_OVERHEAD_BYTES, metadata_filter_expr, search_params
+from vectordb.vector_store import AsyncMilvusVectorStore, VectorStore
+
+
+def make_store(dim):
+    # Skip __init__, _batches needs no connection
+    vdb = MilvusVectorDB.__new__(MilvusVectorDB)
+    vdb.dim = dim
+    return vdb
+
+
+def test_batches_split_by_rows_and_bytes():
+    vdb = make_store(dim=4)
+    texts = ["a" * 100] * 10
+    embeddings = np.zeros((10, 4), dtype=np.float32)
+    metadata = [{}] * 10
+    row_bytes = 16 + ROW_OVERHEAD_BYTES + 100 + 2
+
+    assert list(vdb._batches(texts, embeddings, metadata, 4, 1 << 20)) == [(0, 4), (4, 8), (8, 10)]
+    assert list(vdb._batches(texts, embeddings, metadata, 100, 3 * row_bytes)) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+    # A row larger than the byte limit still goes out on its own
+    assert list(vdb._batches(texts, embeddings, metadata, 100, 1)) == [(i, i + 1) for i in range(10)]
+
+
+def test_metadata_filter_expr():
+    assert metadata_filter_expr({"source": 'a "b".pdf', "page": 3, "draft": False}) == (
+        'metadata["source"] == "a \\"b\\".pdf" and metadata["page"] == 3 and metadata["draft"] == false'
+    )
+    assert metadata_filter_expr({"source": "café.pdf", "owner": None}) == (
+        'metadata["source"] == "café.pdf" and metadata["owner"] is null'
+    )
+    with pytest.raises(ValueError):
+        metadata_filter_expr({"source']": "x"})
+    with pytest.raises(ValueError):
+        metadata_filter_expr({"tags": ["a"]})
+
+
+def test_search_params():
+    assert search_params("HNSW", "COSINE", k=100) == {"metric_type": "COSINE", "params": {"ef": 100}}
+    assert search_params("HNSW", "COSINE", k=5, ef=32) == {"metric_type": "COSINE", "params": {"ef": 32}}
+    assert search_params("IVF_FLAT", "L2", k=5, nprobe=4) == {"metric_type": "L2", "params": {"nprobe": 4}}
+    assert search_params("FLAT", "IP", k=5) == {"metric_type": "IP", "params": {}}
+
+
+def test_milvus_lite_roundtrip(tmp_path):
+    pytest.importorskip("milvus_lite")
+    uri = str(tmp_path / "milvus" / "test.db")
+    vdb = MilvusVectorDB("chunks", dim=8, uri=uri, alias=f"lite-{tmp_path.name}", index_type="HNSW", metric_type="COSINE")
+    try:
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        texts = [f"chunk {i}" for i in range(50)]
+        metadata = [{"source": "a" if i % 2 else "café", "owner": "x" if i % 5 else None} for i in range(50)]
+        ids = vdb.add_documents(texts, vectors, metadata, batch_rows=16)
+        assert len(ids) == 50
+
+        results = vdb.search_many(vectors[:3], k=2)
+        assert [hits[0]["text"] for hits in results] == texts[:3]
+        hits = vdb.similarity_search(vectors[4], k=3, metadata_filter={"source": "a"})
+        assert hits and all(hit["metadata"]["source"] == "a" for hit in hits)
+        hits = vdb.similarity_search(vectors[4], k=50, metadata_filter={"source": "café", "owner": None})
+        assert sorted(hit["text"] for hit in hits) == sorted(texts[i] for i in range(0, 50, 10))
+    finally:
+        vdb.close()
+
+
+def test_async_milvus_store(tmp_path):
+    pytest.importorskip("milvus_lite")
+    vdb = MilvusVectorDB("chunks", dim=8, uri=str(tmp_path / "test.db"), alias=f"lite-{tmp_path.name}", index_type="FLAT")
+
+    async def run():
+        store = AsyncMilvusVectorStore(vdb)
+        assert isinstance(store, VectorStore)
+        await store.init()
+        vectors = np.random.default_rng(1).normal(size=(20, 8))
+        ids = await store.add(vectors, [str(i) for i in range(20)])
+
+        hit = (await store.search(vectors[3], k=1))[0]
+        assert (hit["id"], hit["content"], hit["similarity"]) == (ids[3], "3", pytest.approx(0, abs=1e-4))
+        assert await store.delete(ids[:5]) == 5
+        assert await store.count() == 15
+        assert [row["content"] for row in await store.get_by_ids([ids[6], ids[0], ids[5]])] == ["6", "5"]
+        assert sorted(row["id"] for row in await store.get_all_documents()) == ids[5:]
+        assert sorted(await store.get_all_ids()) == ids[5:]
+        await store.close()
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+import json
+import struct
+import numpy as np
+import pytest
+from vectordb.pgvector import (
+    PGVector, PREFILTER_MAX_ROWS, choose_filter_strategy, metadata_filter_sql, search_settings, vector_index_statement,
+    vector_search_sql
+)
+
+
+def test_copy_rows_binary_encoding():
+    vdb = PGVector.__new__(PGVector)
+    vectors = np.array([[1.0, -2.5, 0.25]], dtype=np.float32)
+    (row,) = vdb._copy_rows([42], vectors, ["héllo"], [{"page": 1}])
+
+    fields, id_len, doc_id = struct.unpack_from("!hii", row)
+    assert (fields, id_len, doc_id) == (4, 4, 42)
+    offset = 10
+    (content_len,) = struct.unpack_from("!i", row, offset)
+    assert row[offset + 4:offset + 4 + content_len].decode("utf-8") == "héllo"
+    offset += 4 + content_len
+    vector_len, dim, unused = struct.unpack_from("!ihh", row, offset)
+    assert (vector_len, dim, unused) == (16, 3, 0)
+    assert struct.unpack_from("!3f", row, offset + 8) == (1.0, -2.5, 0.25)
+    offset += 4 + vector_len
+    (meta_len,) = struct.unpack_from("!i", row, offset)
+    meta = row[offset + 4:offset + 4 + meta_len]
+    assert meta[0] == 1 and json.loads(meta[1:]) == {"page": 1}
+    assert offset + 4 + meta_len == len(row)
+
+
+def test_metadata_filter_sql_uses_expression_indexes():
+    where, params = metadata_filter_sql({"tenant": "acme", "page": 3, "tags": ["a"]}, indexed_keys=["tenant", "page"])
+    assert where == (
+        "metadata @> CAST(:metadata_filter AS jsonb)"
+        " AND metadata->>'tenant' = :metadata_value_0"
+        " AND metadata->>'page' = :metadata_value_1"
+    )
+    assert json.loads(params["metadata_filter"]) == {"tenant": "acme", "page": 3, "tags": ["a"]}
+    assert params["metadata_value_0"] == "acme" and params["metadata_value_1"] == "3"
+    # Floats only use the containment test, 1.0 must still match a stored 1
+    assert metadata_filter_sql({"page": 1.0}, indexed_keys=["page"])[0] == "metadata @> CAST(:metadata_filter AS jsonb)"
+
+
+def test_filtered_vector_search_strategies():
+    pre = vector_search_sql(":q", "metadata @> :f", "pre")
+    post = vector_search_sql(":q", "metadata @> :f", "post")
+    assert "WHERE metadata @> :f" in pre and "LIMIT :candidates" not in pre
+    assert post.index("LIMIT :candidates") < post.index("WHERE metadata @> :f")
+    assert choose_filter_strategy(PREFILTER_MAX_ROWS) == "pre"
+    assert choose_filter_strategy(PREFILTER_MAX_ROWS + 1) == "post"
+    with pytest.raises(ValueError):
+        vdb = PGVector.__new__(PGVector)
+        vdb.search_vectors([0.0], metadata_filter={"a": 1}, filter_strategy="sometimes")
+
+
+def test_search_settings_raise_ef_search_to_limit():
+    # pgvector's default ef_search (40) would cap the rows the HNSW scan returns
+    assert search_settings(None, None, limit=200) == [("hnsw.ef_search", "200")]
+    assert search_settings(None, None, limit=5) == []
+    assert search_settings(100, 4, limit=50) == [("hnsw.ef_search", "100"), ("ivfflat.probes", "4")]
+
+
+def test_quantized_storage_reranks_at_full_precision():
+    assert "(CAST(embedding AS halfvec(1536))) halfvec_cosine_ops" in vector_index_statement("hnsw", storage="halfvec")
+    assert "bit_hamming_ops" in vector_index_statement("ivfflat", storage="bit")
+
+    sql = vector_search_sql(":q", storage="bit")
+    shortlist, rerank = sql.split(") nearest")
+    assert "ORDER BY CAST(binary_quantize(embedding) AS bit(1536)) <~> CAST(binary_quantize(:q) AS bit(1536))" in shortlist
+    assert "LIMIT :candidates" in shortlist
+    assert "ORDER BY embedding <=> :q" in rerank
+    # Exact pre-filtered ranking never goes through the quantized index
+    assert "nearest" not in vector_search_sql(":q", "metadata @> :f", "pre", storage="halfvec")
+    with pytest.raises(ValueError):
+        vector_index_statement(storage="int8")
@@ -0,0 +1,188 @@
+import asyncio
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from vectordb.inmemory import InMemoryVectorStore
+from vectordb.hnsw import HNSWIndex, HNSWVectorStore
+from vectordb.quantization import IVFPQQuantizer, QuantizedVectorStore, ScalarQuantizer
+from vectordb.vector_store import AsyncInMemoryVectorStore, VectorStore
+
+
+def _exact_top_k(vectors, query, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    similarities = vectors @ (query / np.linalg.norm(query))
+    return list(np.argsort(-similarities)[:k] + 1), np.sort(similarities)[::-1][:k]
+
+
+def test_search_matches_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 32)).astype(np.float32)
+    store = InMemoryVectorStore(dim=32, capacity=16)
+    ids = store.add_vectors(vectors, [f"doc {i}" for i in range(300)], [{"i": i} for i in range(300)])
+    assert ids == list(range(1, 301))
+
+    queries = rng.normal(size=(5, 32))
+    for query, results in zip(queries, store.search_batch(queries, k=7)):
+        expected_ids, expected_scores = _exact_top_k(vectors, query, 7)
+        assert [row["id"] for row in results] == expected_ids
+        assert [row["similarity"] for row in results] == pytest.approx(expected_scores, abs=1e-5)
+        assert results[0]["content"] == f"doc {results[0]['id'] - 1}"
+    assert store.search_vectors(queries[0], k=500)[0]["id"] == store.search_batch(queries, k=1)[0][0]["id"]
+
+
+def test_memmap_store_persists(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(40, 8))
+    store = InMemoryVectorStore(dim=8, path=str(tmp_path), capacity=4)
+    store.add_vectors(vectors[:20], [str(i) for i in range(20)])
+    store.add_vectors(vectors[20:], [str(i) for i in range(20, 40)])
+
+    reopened = InMemoryVectorStore(dim=8, path=str(tmp_path))
+    assert reopened.count() == 40
+    assert reopened.search_vectors(vectors[25], k=1)[0]["content"] == "25"
+    assert [row["content"] for row in reopened.get_by_ids([40, 3, 99])] == ["39", "2"]
+    assert reopened.add_vectors(vectors[:1], ["again"]) == [41]
+
+
+def test_hnsw_recall_and_reload(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(500, 16)).astype(np.float32)
+    queries = rng.normal(size=(20, 16))
+    index = HNSWIndex(16, m=8, ef_construction=100)
+    index.add(vectors[:300])
+    index.add(vectors[300:])
+
+    hits = 0
+    for query in queries:
+        expected_ids, expected_scores = _exact_top_k(vectors, query, 10)
+        results = index.search(query, k=10, ef_search=100)
+        hits += len({doc_id - 1 for doc_id in expected_ids} & {position for position, _ in results})
+        assert results[0][1] == pytest.approx(expected_scores[0], abs=1e-5)
+    assert hits / 200 >= 0.95
+
+    index.save(str(tmp_path / "index.npz"))
+    loaded = HNSWIndex.load(str(tmp_path / "index.npz"))
+    assert loaded.search(queries[0], k=10) == index.search(queries[0], k=10)
+    assert loaded.add(vectors[:1], ids=[1000]) == [1000]
+    assert {doc_id for doc_id, _ in loaded.search(vectors[0], k=2)} == {0, 1000}
+
+
+def test_hnsw_store_persists(tmp_path):
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(60, 8))
+    store = HNSWVectorStore(dim=8, path=str(tmp_path), capacity=8, m=4, ef_construction=50)
+    store.add_vectors(vectors[:40], [str(i) for i in range(40)])
+    store.save()
+    # Rows added after the save are linked in when the store is reopened
+    store.add_vectors(vectors[40:], [str(i) for i in range(40, 60)])
+    with np.load(str(tmp_path / "hnsw.npz")) as data:
+        assert "vectors" not in data and len(data["ids"]) == 40
+
+    reopened = HNSWVectorStore(dim=8, path=str(tmp_path), m=4)
+    assert len(reopened.index) == 60
+    assert [results[0]["content"] for results in reopened.search_batch(vectors[[5, 42]], k=3)] == ["5", "42"]
+    assert reopened.search_vectors(vectors[42], k=3)[0]["id"] == 43
+
+
+def test_hnsw_store_concurrent_adds_keep_rows_and_nodes_aligned():
+    rng = np.random.default_rng(8)
+    batches = [rng.normal(size=(20, 8)) for _ in range(8)]
+    store = HNSWVectorStore(dim=8, capacity=8, m=4, ef_construction=20)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda batch: store.add_vectors(batch, ["x"] * len(batch)), batches))
+
+    assert len(store.index) == store.count() == 160
+    np.testing.assert_allclose(store.index._vectors[:160], store._vectors[:160], atol=1e-6)
+
+
+@pytest.mark.parametrize("store_class", [InMemoryVectorStore, HNSWVectorStore])
+def test_searches_during_deletes_return_consistent_rows(store_class):
+    rng = np.random.default_rng(9)
+    vectors = rng.normal(size=(200, 8))
+    store = store_class(dim=8, capacity=8)
+    ids = store.add_vectors(vectors, [""] * 200)
+    # Content of each row is its id, so a row mixing old and new lists is detected
+    store.contents[:] = [str(doc_id) for doc_id in ids]
+
+    def search(query):
+        return [row for hits in store.search_batch([query] * 4, k=10) for row in hits]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(search, query) for query in rng.normal(size=(200, 8))]
+        for doc_id in ids[:100:10]:
+            store.delete([doc_id])
+        rows = [row for future in futures for row in future.result()]
+    assert all(row["content"] == str(row["id"]) for row in rows)
+
+
+@pytest.mark.parametrize("quantizer", [ScalarQuantizer(16), IVFPQQuantizer(16, nlist=4, m=4, nprobe=4)])
+def test_quantized_store_rescores_at_full_precision(quantizer):
+    rng = np.random.default_rng(4)
+    vectors = rng.normal(size=(400, 16)).astype(np.float32)
+    store = QuantizedVectorStore(dim=16, quantizer=quantizer, rescore=10)
+    store.add_vectors(vectors[:300], [str(i) for i in range(300)])
+    store.train()
+    store.add_vectors(vectors[300:], [str(i) for i in range(300, 400)])
+    assert quantizer.size == 400
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    for query in rng.normal(size=(5, 16)):
+        expected_ids, _ = _exact_top_k(vectors, query, 5)
+        results = store.search_vectors(query, k=5)
+        assert results[0]["id"] == expected_ids[0]
+        # Similarities come from the full-precision rows
+        similarities = normalized[[row["id"] - 1 for row in results]] @ (query / np.linalg.norm(query))
+        assert [row["similarity"] for row in results] == pytest.approx(similarities, abs=1e-5)
+
+
+def test_scalar_quantizer_round_trip():
+    vectors = np.random.default_rng(5).uniform(-1, 1, size=(100, 8)).astype(np.float32)
+    quantizer = ScalarQuantizer(8).train(vectors)
+    codes = quantizer.encode(vectors)
+    assert codes.dtype == np.int8
+    assert np.abs(quantizer.decode(codes) - vectors).max() <= quantizer.scale.max() / 2 + 1e-6
+
+
+@pytest.mark.parametrize("store_class", [InMemoryVectorStore, HNSWVectorStore])
+def test_delete_compacts_store(tmp_path, store_class):
+    rng = np.random.default_rng(6)
+    vectors = rng.normal(size=(60, 8))
+    store = store_class(dim=8, path=str(tmp_path), capacity=8)
+    store.add_vectors(vectors, [str(i) for i in range(60)])
+
+    assert store.delete([1, 30, 30, 999]) == 2
+    assert store.delete([1]) == 0
+    assert store.count() == 58
+    assert store.search_vectors(vectors[31], k=1)[0]["id"] == 32
+    assert all(row["id"] != 30 for row in store.search_vectors(vectors[29], k=5))
+
+    reopened = store_class(dim=8, path=str(tmp_path))
+    assert reopened.count() == 58
+    assert [row["content"] for row in reopened.get_by_ids([30, 31])] == ["30"]
+    assert reopened.add_vectors(vectors[:1], ["new"]) == [61]
+
+
+@pytest.mark.parametrize("store_class", [InMemoryVectorStore, HNSWVectorStore])
+def test_async_in_memory_store(store_class):
+    async def run():
+        rng = np.random.default_rng(7)
+        vectors = rng.normal(size=(50, 8))
+        store = AsyncInMemoryVectorStore(store_class(dim=8))
+        assert isinstance(store, VectorStore)
+        await store.init()
+        ids = await store.add(vectors, [str(i) for i in range(50)], [{"parity": i % 2} for i in range(50)])
+
+        assert (await store.search(vectors[4], k=1))[0]["id"] == ids[4]
+        filtered = await store.search(vectors[4], k=5, metadata_filter={"parity": 1})
+        assert len(filtered) == 5 and all(row["metadata"]["parity"] == 1 for row in filtered)
+        results = await store.search_many(vectors[:3], k=2)
+        assert [hits[0]["id"] for hits in results] == ids[:3]
+
+        assert await store.delete(ids[:10]) == 10
+        assert await store.count() == 40
+        assert [row["id"] for row in await store.get_by_ids(ids[8:12])] == ids[10:12]
+        assert len(await store.get_all_documents()) == 40
+        assert await store.get_all_ids() == ids[10:]
+        await store.close()
+
+    asyncio.run(run())
@@ -0,0 +1,68 @@
+import asyncio
+import numpy as np
+from search.bm25_index import BM25Index, tokenize
+from search.weight_rerank import WeightRerank
+from vectordb.inmemory import InMemoryVectorStore
+from vectordb.vector_store import AsyncInMemoryVectorStore
+
+documents = ["bm25 ranks by words", "vectors rank by meaning", "hybrid search uses bm25 and vectors"]
+
+
+class FixedQueryCache:
+    """Query embedding cache returning the same vector for every query."""
+
+    def __init__(self, vector):
+        self.vector = vector
+
+    def get_embedding(self, query):
+        return self.vector
+
+
+def _rerank(monkeypatch, bm25_index=None):
+    # The embedding client is built eagerly, queries are served by FixedQueryCache
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    vectors = np.eye(3, 8)
+    store = AsyncInMemoryVectorStore(InMemoryVectorStore(dim=8))
+    ids = asyncio.run(store.add(vectors, documents))
+    return WeightRerank(FixedQueryCache(vectors[1]), store, bm25_index), ids
+
+
+def test_delete_documents_updates_bm25_index(monkeypatch):
+    rerank, ids = _rerank(monkeypatch)
+    asyncio.run(rerank.load_bm25_index())
+    assert asyncio.run(rerank.delete_documents([ids[0]])) == 1
+    assert rerank.bm25_index.doc_ids() == set(ids[1:])
+    results = asyncio.run(rerank.run("bm25 words", k=3, hybrid_search=True))
+    assert documents[0] not in results and documents[2] in results
+
+
+def test_hybrid_search_skips_ids_missing_from_store(monkeypatch):
+    rerank, ids = _rerank(monkeypatch)
+    asyncio.run(rerank.load_bm25_index())
+    # Deleted behind the index's back, BM25 still returns the id
+    asyncio.run(rerank.vector_store.delete([ids[0]]))
+    results = asyncio.run(rerank.run("bm25 words", k=3, hybrid_search=True))
+    assert documents[0] not in results and documents[2] in results
+
+
+def test_stale_snapshot_with_matching_count_is_rebuilt(monkeypatch, tmp_path):
+    snapshot = BM25Index(snapshot_path=str(tmp_path / "bm25.idx"))
+    snapshot.add_documents([1, 2, 99], [tokenize(document) for document in documents])
+    rerank, ids = _rerank(monkeypatch, BM25Index(snapshot_path=str(tmp_path / "bm25.idx")))
+    assert len(rerank.bm25_index) == len(ids)
+
+    asyncio.run(rerank.load_bm25_index())
+    assert rerank.bm25_index.doc_ids() == set(ids)
+
+
+def test_matching_snapshot_is_reused_without_fetching_contents(monkeypatch, tmp_path):
+    snapshot = BM25Index(snapshot_path=str(tmp_path / "bm25.idx"))
+    snapshot.add_documents([1, 2, 3], [tokenize(document) for document in documents])
+    rerank, ids = _rerank(monkeypatch, BM25Index(snapshot_path=str(tmp_path / "bm25.idx")))
+    assert ids == [1, 2, 3]
+
+    async def get_all_documents():
+        raise AssertionError("contents are only fetched to rebuild the index")
+    monkeypatch.setattr(rerank.vector_store, "get_all_documents", get_all_documents)
+    asyncio.run(rerank.load_bm25_index())
+    assert rerank.bm25_index.doc_ids() == set(ids)